@@ -8,18 +8,22 @@
 """
 
 from __future__ import division, print_function, absolute_import
-from builtins import str
-from builtins import range
 import os.path
+import re
 import logging
 
 import pygaarst.irutils as ir
+import pygaarst.rasterhelpers as rh
 from pygaarst.rasterhelpers import PygaarstRasterError
 from pygaarst.usgsl1 import USGSL1scene, USGSL1band, _validate_platformorigin
 
 logging.basicConfig(level=logging.DEBUG)
 LOGGER = logging.getLogger('pygaarst.ali')
 
+# attribute names starting with band, in any capitalization: all of them
+# are band labels, and invalid ones raise PygaarstRasterError
+BANDPATTERN = re.compile(r'band(.*)$', re.IGNORECASE)
+
 
 class ALIscene(USGSL1scene):
     """
@@ -30,6 +34,8 @@ class ALIscene(USGSL1scene):
     def __init__(self, dirname):
         super(ALIscene, self).__init__(dirname)
         self.permissiblebandid = [str(num) for num in range(1, 11)]
+        self._bandlookup = dict(
+            ('band%s' % bandid, bandid) for bandid in self.permissiblebandid)
         _validate_platformorigin('ALI', self.spacecraft, self.sensor)
 
     def __getattr__(self, bandname):
@@ -43,30 +49,26 @@ class ALIscene(USGSL1scene):
         pre-processed bands.
         """
         # see https://eo1.usgs.gov/sensors/hyperioncoverage
-        isband = False
-        head, _, tail = bandname.lower().partition('band')
-        try:
-            band = tail.upper()
-            if head == '':
-                if band in self.permissiblebandid:
-                    isband = True
-                else:
-                    raise PygaarstRasterError(
-                        "EO-1 ALI does not have a band %s. " +
-                        "Permissible band labels are between 1 and 10.")
-        except ValueError:
-            pass
-        if isband:
-            # Note: Landsat 7 has low and high gain bands 6,
-            # with different label names
-            keyname = "BAND%s_FILE_NAME" % band
-            bandfn = self.meta['PRODUCT_METADATA'][keyname]
-            base, ext = os.path.splitext(bandfn)
-            postprocessfn = base + self.infix + ext
-            bandpath = os.path.join(self.dirname, postprocessfn)
+        # fast path: exact lower-case band labels, as in self.band2
+        band = self.__dict__.get('_bandlookup', {}).get(bandname)
+        if band is None:
+            mat = BANDPATTERN.match(bandname)
+            if not mat:
+                return object.__getattribute__(self, bandname)
+            band = mat.group(1).upper()
+            if band not in self.permissiblebandid:
+                raise PygaarstRasterError(
+                    "EO-1 ALI does not have a band %s. " % band +
+                    "Permissible band labels are between 1 and 10.")
+        keyname = "BAND%s_FILE_NAME" % band
+        bandfn = self.meta['PRODUCT_METADATA'][keyname]
+        base, ext = os.path.splitext(bandfn)
+        postprocessfn = base + self.infix + ext
+        bandpath = os.path.join(self.dirname, postprocessfn)
+        # reuse the band object unless the infix has changed since
+        if band not in self.bands or self.bands[band].filepath != bandpath:
             self.bands[band] = ALIband(bandpath, band=band, scene=self)
-            return self.bands[band]
-        return object.__getattribute__(self, bandname)
+        return self.bands[band]
 
 
 class ALIband(USGSL1band):
@@ -76,16 +78,21 @@ class ALIband(USGSL1band):
     def __init__(self, filepath, band=None, scene=None):
         super(ALIband, self).__init__(filepath, band=band, scene=scene)
         _validate_platformorigin('ALI', self.spacecraft, self.sensor)
+        self._radiance = None
 
     @property
     def radiance(self):
         """Radiance in W / um / m^2 / sr derived from digital number
-        and metadata, as numpy array"""
-        if not self.meta:
-            raise PygaarstRasterError(
-                "Impossible to retrieve metadata for band. " +
-                "No radiance calculation possible.")
-        self.gain = self.meta[
-            'RADIANCE_SCALING']['BAND%s_SCALING_FACTOR' % self.band]
-        self.bias = self.meta['RADIANCE_SCALING']['BAND%s_OFFSET' % self.band]
-        return ir.dn2rad(self.data, self.gain, self.bias)
+        and metadata, as read-only numpy array. Computed on first access
+        only."""
+        if self._radiance is None:
+            if not self.meta:
+                raise PygaarstRasterError(
+                    "Impossible to retrieve metadata for band. " +
+                    "No radiance calculation possible.")
+            scaling = self.meta['RADIANCE_SCALING']
+            self.gain = scaling['BAND%s_SCALING_FACTOR' % self.band]
+            self.bias = scaling['BAND%s_OFFSET' % self.band]
+            self._radiance = rh._readonly(
+                ir.dn2rad(self.data, self.gain, self.bias))
+        return self._radiance
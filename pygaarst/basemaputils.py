@@ -8,8 +8,6 @@ Created by Chris Waigl on 2013-09-21.
 """
 
 from __future__ import division, print_function, absolute_import
-
-from builtins import zip
 import logging
 import numpy as np
 from mpl_toolkits.basemap import Basemap
@@ -45,15 +43,21 @@ def map_interiorAK(
     bmap.drawmapboundary(fill_color=water)
     return bmap
 
-def extractLons(listoftups):
-    """Given a sequence of tuples the first two elements of which are
-    longitude and latitude, return list of lons"""
-    return [item[0] for item in listoftups]
-
-def extractLats(listoftups):
-    """Given a sequence of tuples the first two elements of which are
-    longitude and latitude, return list of lons"""
-    return [item[1] for item in listoftups]
+def _transformrings(mmap, rings):
+    """Given a Basemap object and a sequence of coordinate sequences in
+    geographic coordinates, return a list of lists of map coordinate tuples.
+    All coordinates are transformed with a single call to the Basemap."""
+    coords = [np.asarray(ring, dtype=np.float64) for ring in rings]
+    if not coords:
+        return []
+    offsets = np.cumsum([len(ring) for ring in coords])[:-1]
+    allcoords = np.concatenate(coords)
+    xs, ys = mmap(allcoords[:, 0], allcoords[:, 1])
+    return [
+        list(zip(ringxs.tolist(), ringys.tolist()))
+        for ringxs, ringys in zip(
+            np.split(np.asarray(xs), offsets), np.split(np.asarray(ys), offsets))
+        ]
 
 def maptransform(mmap, record):
     """Given a Basemap object and a Fiona collection record in geographic
@@ -61,19 +65,20 @@ def maptransform(mmap, record):
     the map CRS"""
     if record['geometry']['type'].lower() in ['polygon', 'point', 'linestring']:
         print("record type is {}".format(record['geometry']['type']))
-        record['geometry']['coordinates'] = [
-            list(zip(*mmap(extractLons(listoftups), extractLats(listoftups))))
-            for listoftups in record['geometry']['coordinates']
-            ]
+        record['geometry']['coordinates'] = _transformrings(
+            mmap, record['geometry']['coordinates'])
     elif record['geometry']['type'].lower() in ['multipolygon', 'multipoint', 'multilinestring']:
         print("record type is {}".format(record['geometry']['type']))
-        record['geometry']['coordinates'] = [
-            [
-                list(zip(*mmap(extractLons(listoftups), extractLats(listoftups))))
-                for listoftups in recorditem
-            ]
-            for recorditem in record['geometry']['coordinates'][0]
-            ]
+        recorditems = record['geometry']['coordinates'][0]
+        # transform all rings of the record at once, then regroup them
+        transformed = _transformrings(
+            mmap, [listoftups for recorditem in recorditems
+                   for listoftups in recorditem])
+        record['geometry']['coordinates'] = []
+        for recorditem in recorditems:
+            record['geometry']['coordinates'].append(
+                transformed[:len(recorditem)])
+            transformed = transformed[len(recorditem):]
     else:
         raise NotImplementedError("Unkown record type {}".format(record['geometry']['type']))
     return record
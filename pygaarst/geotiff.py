@@ -8,9 +8,6 @@
 """
 
 from __future__ import division, print_function, absolute_import
-from builtins import str
-from builtins import range
-from builtins import object
 import os.path
 import logging
 import numpy as np
@@ -27,6 +24,25 @@ except ImportError:
         "PROJ4 is not available. " +
         "Any method requiring coordinate transform will fail.")
 
+# convert Numpy dtype objects to GDAL type codes
+# see https://gist.github.com/chryss/8366492
+NPDTYPE2GDALTYPECODE = {
+    "uint8": 1,
+    "int8": 1,
+    "uint16": 2,
+    "int16": 3,
+    "uint32": 4,
+    "int32": 5,
+    "float32": 6,
+    "float64": 7,
+    "complex64": 10,
+    "complex128": 11,
+}
+
+# Coordinate grids are transformed in blocks of this many rows, which keeps
+# the temporary arrays handed to PROJ4 small
+TRANSFORMCHUNKROWS = 256
+
 
 class GeoTIFF(object):
     """
@@ -60,25 +76,48 @@ class GeoTIFF(object):
                 "by: (%s). " % ', '.join([str(item) for item in self._gtr]) +
                 "Northing and easting values will not have expected meaning."
             )
+        # check if data grid steps are consistent
+        if np.abs((self.lrx - self.ulx) / self.ncol - self.delx) > 10e-2:
+            LOGGER.warning(
+                "GeoTIFF issue: E-W grid step differs from " +
+                "deltaX by more than 1% ")
+        if np.abs((self.lry - self.uly) / self.nrow - self.dely) > 10e-2:
+            LOGGER.warning(
+                "GeoTIFF issue: N-S grid step differs from " +
+                "deltaY by more than 1% ")
+        self._easting = None
+        self._northing = None
+        self._x_pxcenter = None
+        self._y_pxcenter = None
+        # coordinate transforms are expensive: computed once, on first use
+        self._lonlat_pxcorner = None
+        self._lonlat_pxcenter = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _ensure_open(self):
+        """Returns the GDAL dataset, (re)opening the file if it was closed"""
+        if self.dataobj is None:
+            self.dataobj = gdal.Open(self.filepath)
+        return self.dataobj
+
+    def close(self):
+        """Releases the GDAL dataset. It is reopened on next data access."""
         self.dataobj = None
 
     @property
     def data(self):
         """2D numpy array for single-band GeoTIFF file data. Otherwise, 3D. """
-        if not self.dataobj:
-            self.dataobj = gdal.Open(self.filepath)
-        dat = self.dataobj.ReadAsArray()
-        self.dataobj = None
-        return dat
+        return self._ensure_open().ReadAsArray()
 
     @property
     def projection(self):
         """The dataset's coordinate reference system as a Well-Known String"""
-        if not self.dataobj:
-            self.dataobj = gdal.Open(self.filepath)
-        dat = self.dataobj.GetProjection()
-        self.dataobj = None
-        return dat
+        return self._ensure_open().GetProjection()
 
     @property
     def proj4(self):
@@ -110,45 +149,36 @@ class GeoTIFF(object):
         """The x-coordinates of first row pixel corners,
         as a numpy array: upper-left corner of upper-left pixel
         to upper-right corner of upper-right pixel (ncol+1)."""
-        delta = np.abs(
-            (self.lrx - self.ulx) / self.ncol -
-            self.delx)
-        if delta > 10e-2:
-            LOGGER.warn(
-                "GeoTIFF issue: E-W grid step differs from " +
-                "deltaX by more than 1% ")
-        return np.linspace(self.ulx, self.lrx, self.ncol + 1)
+        if self._easting is None:
+            self._easting = rh._readonly(
+                self.ulx + np.arange(self.ncol + 1) * self.delx)
+        return self._easting
 
     @property
     def northing(self):
         """The y-coordinates of first column pixel corners,
         as a numpy array: lower-left corner of lower-left pixel to
         upper-left corner of upper-left pixel (nrow+1)."""
-        # check if data grid step is consistent
-        delta = np.abs(
-            (self.lry - self.uly) / self.nrow -
-            self.dely)
-        if delta > 10e-2:
-            LOGGER.warn(
-                "GeoTIFF issue: N-S grid step differs from " +
-                "deltaY by more than 1% ")
-        return np.linspace(self.lry, self.uly, self.nrow + 1)
+        if self._northing is None:
+            self._northing = rh._readonly(
+                self.lry - np.arange(self.nrow + 1) * self.dely)
+        return self._northing
 
     @property
     def x_pxcenter(self):
         """The x-coordinates of pixel centers, as a numpy array ncol."""
-        return np.linspace(
-            self.ulx + self.delx / 2,
-            self.lrx - self.delx / 2,
-            self.ncol)
+        if self._x_pxcenter is None:
+            self._x_pxcenter = rh._readonly(
+                self.ulx + (np.arange(self.ncol) + 0.5) * self.delx)
+        return self._x_pxcenter
 
     @property
     def y_pxcenter(self):
         """y-coordinates of pixel centers, nrow."""
-        return np.linspace(
-            self.lry - self.dely / 2,
-            self.uly + self.dely / 2,
-            self.nrow)
+        if self._y_pxcenter is None:
+            self._y_pxcenter = rh._readonly(
+                self.lry - (np.arange(self.nrow) + 0.5) * self.dely)
+        return self._y_pxcenter
 
     @property
     def _XY(self):
@@ -160,15 +190,51 @@ class GeoTIFF(object):
         """Meshgrid of nrow, ncol center xy coordinates"""
         return np.meshgrid(self.x_pxcenter, self.y_pxcenter)
 
+    @property
+    def _XY_sparse(self):
+        """Sparse meshgrid of corner xy coordinates: 1, ncol+1 and nrow+1, 1
+        arrays that broadcast to the shape of _XY without allocating it"""
+        return np.meshgrid(self.easting, self.northing, sparse=True)
+
+    @property
+    def _XY_pxcenter_sparse(self):
+        """Sparse meshgrid of center xy coordinates: 1, ncol and nrow, 1
+        arrays that broadcast to the shape of _XY_pxcenter"""
+        return np.meshgrid(self.x_pxcenter, self.y_pxcenter, sparse=True)
+
     @property
     def _LonLat_pxcorner(self):
         """Meshgrid of nrow+1, ncol+1 corner Lon/Lat coordinates"""
-        return self.coordtrans(*self._XY, inverse=True)
+        if self._lonlat_pxcorner is None:
+            self._lonlat_pxcorner = self._transformgrid(*self._XY_sparse)
+        return self._lonlat_pxcorner
 
     @property
     def _LonLat_pxcenter(self):
         """Meshgrid of nrow, ncol center Lon/Lat coordinates"""
-        return self.coordtrans(*self._XY_pxcenter, inverse=True)
+        if self._lonlat_pxcenter is None:
+            self._lonlat_pxcenter = self._transformgrid(
+                *self._XY_pxcenter_sparse)
+        return self._lonlat_pxcenter
+
+    def _transformgrid(self, xgrid, ygrid):
+        """Lon/Lat arrays for the grid given as a sparse xy meshgrid,
+        transformed in blocks of TRANSFORMCHUNKROWS rows"""
+        coordtrans = self.coordtrans
+        xvec, yvec = xgrid.ravel(), ygrid.ravel()
+        ncol = len(xvec)
+        lon = np.empty((len(yvec), ncol))
+        lat = np.empty((len(yvec), ncol))
+        for start in range(0, len(yvec), TRANSFORMCHUNKROWS):
+            ychunk = yvec[start:start + TRANSFORMCHUNKROWS]
+            # flat, contiguous input: no 2D meshgrid needs to be built
+            lonchunk, latchunk = coordtrans(
+                np.tile(xvec, len(ychunk)), np.repeat(ychunk, ncol),
+                inverse=True)
+            lon[start:start + len(ychunk)] = np.reshape(lonchunk, (-1, ncol))
+            lat[start:start + len(ychunk)] = np.reshape(latchunk, (-1, ncol))
+        # cached by the callers and shared: not to be modified in place
+        return rh._readonly(lon), rh._readonly(lat)
 
     @property
     def Lon(self):
@@ -214,8 +280,8 @@ class GeoTIFF(object):
                 rh._test_outside(j, 0, self.ncol)):
             raise PygaarstRasterError(
                 "Coordinates %d, %d out of bounds" % (i, j))
-        x = self.easting[0] + j * self.delx
-        y = self.northing[-1] + i * self.dely
+        x = self.ulx + j * self.delx
+        y = self.uly + i * self.dely
         return x, y
 
     def xy2ij(self, x, y, precise=False):
@@ -230,33 +296,39 @@ class GeoTIFF(object):
             y (float): scalar or array of northing coordinates
             precise (bool): if true, return fractional array coordinates
 
+        x and y are broadcast against each other, so a scalar can be
+        combined with an array (eg. all pixels along one northing).
+
         Returns:
             i (int, or float): scalar or array of row coordinate index
             j (int, or float): scalar or array of column coordinate index
         """
-        if (rh._test_outside(x, self.easting[0], self.easting[-1]) or
-                rh._test_outside(y, self.northing[0], self.northing[-1])):
+        if (rh._test_outside(x, self.ulx, self.lrx) or
+                rh._test_outside(y, self.lry, self.uly)):
             raise PygaarstRasterError("Coordinates out of bounds")
-        i = (1 - (y - self.northing[0]) /
-             (self.northing[-1] - self.northing[0])) * self.nrow
-        j = ((x - self.easting[0]) /
-             (self.easting[-1] - self.easting[0])) * self.ncol
+        if np.ndim(x) != 0 or np.ndim(y) != 0:
+            x, y = np.broadcast_arrays(x, y)
+        i = (y - self.uly) / self.dely
+        j = (x - self.ulx) / self.delx
         if precise:
             return i, j
-        return int(np.floor(i)), int(np.floor(j))
+        if np.ndim(i) == 0 and np.ndim(j) == 0:
+            return int(np.floor(i)), int(np.floor(j))
+        return np.floor(i).astype(int), np.floor(j).astype(int)
 
     def simpleplot(self):
         """Quick and dirty plot of each band (channel, dataset) in the image.
         Requires Matplotlib."""
         import matplotlib.pyplot as plt
         numbands = self.nbands
+        dat = self.data
         if numbands == 1:
             plt.figure(figsize=(15, 10))
-            plt.imshow(self.data[:, :], cmap='bone')
+            plt.imshow(dat[:, :], cmap='bone')
         elif numbands > 1:
+            _, axes = plt.subplots(1, numbands, figsize=(15 * numbands, 10))
             for idx in range(numbands):
-                plt.figure(figsize=(15, 10))
-                plt.imshow(self.data[idx, :, :], cmap='bone')
+                axes[idx].imshow(dat[idx, :, :], cmap='bone')
         return True
 
     def clone(self, newpath, newdata):
@@ -270,21 +342,6 @@ class GeoTIFF(object):
         Returns:
             A raster.GeoTIFF object
         """
-        # convert Numpy dtype objects to GDAL type codes
-        # see https://gist.github.com/chryss/8366492
-
-        NPDTYPE2GDALTYPECODE = {
-            "uint8": 1,
-            "int8": 1,
-            "uint16": 2,
-            "int16": 3,
-            "uint32": 4,
-            "int32": 5,
-            "float32": 6,
-            "float64": 7,
-            "complex64": 10,
-            "complex128": 11,
-        }
         # check if newpath is potentially a valid file path to save data
         dirname, fname = os.path.split(newpath)
         if dirname:
@@ -295,8 +352,11 @@ class GeoTIFF(object):
             LOGGER.warning(
                 "%s is a directory." % dirname + " Choose a name " +
                 "that is suitable for writing a dataset to.")
-        if (newdata.shape != self.data.shape and
-                newdata.shape != self.data[0, ...].shape):
+        # shape of self.data, without reading the raster from disk
+        datashape = (self.nrow, self.ncol)
+        if self.nbands > 1:
+            datashape = (self.nbands,) + datashape
+        if newdata.shape != datashape and newdata.shape != datashape[1:]:
             raise PygaarstRasterError(
                 "New and cloned GeoTIFF dataset must be the same shape.")
         dims = newdata.ndim
@@ -325,7 +385,7 @@ class GeoTIFF(object):
         if dims == 2:
             gtiff.GetRasterBand(1).WriteArray(newdata)
         else:
-            for idx in range(dims):
+            for idx in range(bands):
                 gtiff.GetRasterBand(idx + 1).WriteArray(newdata[idx, :, :])
         gtiff = None
         return GeoTIFF(newpath)
@@ -8,16 +8,18 @@
 """
 
 from __future__ import division, print_function, absolute_import
-from builtins import zip
 from builtins import str
-from builtins import filter
 from builtins import object
 from builtins import bytes
 import os.path
 import re
-import glob
-from collections import OrderedDict
-from xml.dom import minidom
+import math
+from collections import OrderedDict, deque
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    # Python 3.9+: the C accelerator is used automatically
+    import xml.etree.ElementTree as ElementTree
 
 import logging
 logging.basicConfig(level=logging.DEBUG)
@@ -33,6 +35,12 @@ except ImportError:
         "Any method requiring coordinate transform will fail.")
 from pygaarst.rasterhelpers import PygaarstRasterError
 
+try:
+    from os import scandir
+except ImportError:
+    # Python 2: directory listings fall back to os.listdir and stat calls
+    scandir = None
+
 try:
     import h5py
 except ImportError:
@@ -51,16 +59,15 @@ class HDF5(object):
         try:
             self.filepath = filepath
             self.dirname = os.path.dirname(filepath)
-            # We'll want, possibly, metadata from the user block, for which
-            # the HDF5 obj needs to be closed, but we first need the
-            # userblock length. Thus some odd rigamarole...
             self.dataobj = h5py.File(filepath, "r")
-            if self.dataobj.userblock_size != 0:
-                self.userblock_size = self.dataobj.userblock_size
-                self.dataobj.close()
+            # We'll want, possibly, metadata from the user block. It
+            # precedes the HDF5 data, so it can be read through a separate
+            # plain file handle while the HDF5 object stays open.
+            self.userblock_size = self.dataobj.userblock_size
+            self.userblock = None
+            if self.userblock_size != 0:
                 with open(self.filepath, 'rb') as source:
                     self.userblock = source.read(self.userblock_size)
-                self.dataobj = h5py.File(filepath, "r")
         except IOError as err:
             LOGGER.error("Could not open %s: %s" % (filepath, err.message))
             raise
@@ -78,42 +85,54 @@ def _getlabel(groupname):
         return labelelems[-2]
 
 def _handlenode(node, outdict):
-    """Recursive function to parse metadata dictionaries for VIIRS.
+    """Parses VIIRS metadata XML into nested dictionaries. Elements without
+    child elements map to their text; repeated elements with children are
+    collected in a list. The tree is walked iteratively, in document order.
 
     Arguments:
-        node: an XML.minidom node
-        outdict: the recursively assembled metadata dictionary
+        node: an ElementTree element
+        outdict: the metadata dictionary to add to
     """
-    if not node.childNodes:
-        outdict[node.nodeName] = None
-    elif node.firstChild.nodeType == node.TEXT_NODE:
-        outdict[node.nodeName] = node.firstChild.nodeValue
-    else:
+    queue = deque([(outdict, node)])
+    while queue:
+        parentdict, element = queue.popleft()
+        if len(element) == 0:
+            parentdict[element.tag] = element.text
+            continue
         newdict = {}
-        for childnode in node.childNodes:
-            newdict = _handlenode(childnode, newdict)
-        try:
-            outdict[node.nodeName].append(newdict)
-        except KeyError:
-            outdict[node.nodeName] = newdict
-        except AttributeError:
-            outdict[node.nodeName] = [outdict[node.nodeName]]
-            outdict[node.nodeName].append(newdict)
-#        print(newdict)
+        if element.tag not in parentdict:
+            parentdict[element.tag] = newdict
+        elif isinstance(parentdict[element.tag], list):
+            parentdict[element.tag].append(newdict)
+        else:
+            parentdict[element.tag] = [parentdict[element.tag], newdict]
+        queue.extend((newdict, child) for child in element)
     return outdict
 
-def _latlonmetric(latarray, latref, lonarray, lonref):
+def _latlonmetric(latarray, latref, lonarray, lonref, squared=False):
     """Takes two numpy arrays of longitudes and latitudes and returns an
-    array of the same shape of metrics representing distance for short distances"""
-    if latarray.shape != latarray.shape:
+    array of the same shape of metrics representing distance for short distances.
+    With squared=True the square root is skipped, which preserves ordering
+    (enough for argmin)."""
+    if latarray.shape != lonarray.shape:
         #arrays aren't the same shape
         raise PygaarstRasterError(
             "Latitude and longitude arrays have to be the same shape for " +
             "distance comparisons."
         )
-    return np.sqrt(
-        np.square(latarray - latref) +
-            np.cos(np.radians(latarray)) * np.square(lonarray - lonref))
+    # the longitude weight is taken at the reference latitude: over the
+    # short distances this metric is meant for it is practically constant
+    lonweight = math.cos(math.radians(latref))
+    # two work buffers, updated in place, instead of one temporary per step
+    metric = np.subtract(lonarray, lonref)
+    np.square(metric, out=metric)
+    metric *= lonweight
+    work = np.subtract(latarray, latref)
+    np.square(work, out=work)
+    metric += work
+    if not squared:
+        np.sqrt(metric, out=metric)
+    return metric
 
 class VIIRSHDF5(HDF5):
     """
@@ -126,54 +145,61 @@ class VIIRSHDF5(HDF5):
     """
     def __init__(self, filepath, geofilepath=None, variable=None):
         super(VIIRSHDF5, self).__init__(filepath)
+        # georeference data is opened and read on first use only
+        self._geodata = None
+        self._lats = None
+        self._lons = None
         # put together metadata. First from the userblock, if any:
         self.meta = {}
         if self.userblock:
-            self.userblock = self.userblock.rstrip(bytes(b'\x00'))
-            parsed_ub = minidom.parseString(self.userblock)
-            metadatablock = parsed_ub.getElementsByTagName("HDF_UserBlock")
-            for node in metadatablock[0].childNodes:
+            self.userblock = self.userblock.strip(bytes(b'\x00'))
+        if self.userblock:
+            parsed_ub = ElementTree.fromstring(self.userblock)
+            metadatablock = next(parsed_ub.iter("HDF_UserBlock"))
+            for node in metadatablock:
                 self.meta = _handlenode(node, self.meta)
-        # ... and then from the HDF5 dataobject attributes:
-        for key in self.dataobj.attrs:
-            self.meta[key] = str(self.dataobj.attrs[key][0][0])
-        self.bandnames = list(self.dataobj['All_Data'].keys())
+        # ... and then from the HDF5 dataobject attributes, each read once
+        # (VIIRS stores them as 2D arrays holding a single value):
+        attrs = dict(self.dataobj.attrs.items())
+        self.meta.update(
+            (key, str(np.ravel(value)[0])) for key, value in attrs.items())
+        # iterate over the All_Data group once and keep the group object
+        self._alldata = self.dataobj['All_Data']
+        self.bandnames = list(self._alldata.keys())
         self.bandlabels = {_getlabel(nm): nm for nm in self.bandnames}
         self.bands = {}
-        self.bandname = list(self.dataobj['All_Data'].keys())[0]
+        self.bandname = self.bandnames[0]
         try:
             self.longbandname = self.meta[u'Data_Product']['N_Collection_Short_Name'] + u'_All'
-        except TypeError:
+        except (TypeError, KeyError):
             pass
-        self.datasets = list(self.dataobj['All_Data/'+self.bandname].items())
+        self.datasets = list(self._alldata[self.bandname].items())
         if geofilepath:
             self.geofilepath = geofilepath
         else:
-            try:
-                if not np.shape(self.dataobj.attrs['N_GEO_Ref']):
-                    geofn = self.dataobj.attrs['N_GEO_Ref']
-                elif (len(np.shape(self.dataobj.attrs['N_GEO_Ref'])) == 1):
-                    geofn = self.dataobj.attrs['N_GEO_Ref'][0]
-                elif (len(np.shape(self.dataobj.attrs['N_GEO_Ref'])) == 2):
-                    geofn = self.dataobj.attrs['N_GEO_Ref'][0][0]
-                else:
-                    geofn = None
-                self.geofilepath = os.path.join(self.dirname, geofn)
-            except KeyError:
+            geofn = attrs.get('N_GEO_Ref')
+            if geofn is None:
                 self.geofilepath = None
+            else:
+                geofn = np.ravel(geofn)[0]
+                if isinstance(geofn, bytes):
+                    geofn = geofn.decode('utf-8')
+                self.geofilepath = os.path.join(self.dirname, geofn)
 
     def __getattr__(self, bandname):
         """
         Override _gettattr__() for bandnames in self.bandlabels.
         """
         if bandname in self.bandlabels:
-            return self.dataobj['All_Data/' + self.bandlabels[bandname]]
+            return self._alldata[self.bandlabels[bandname]]
         else:
             return object.__getattribute__(self, bandname)
 
     @property
     def geodata(self):
         """Object representing the georeference data, in its entirety"""
+        if self._geodata is not None:
+            return self._geodata
         if self.geofilepath:
             try:
                 geodat = h5py.File(self.geofilepath, "r")
@@ -182,22 +208,29 @@ class VIIRSHDF5(HDF5):
                     "Unable to open georeference file {}: {}".format(
                         self.geofilepath, err)
                 )
-            self.geogroupkey = list(geodat['All_Data'].keys())[0]
-            return geodat['All_Data/%s' % self.geogroupkey]
+            geogroup = geodat['All_Data']
+            self.geogroupkey = next(iter(geogroup))
+            self._geodata = geogroup[self.geogroupkey]
         elif self.GEO:
             # It could be an aggregated multi-band VIIRS file
             # with embedded georeferences
-            return self.GEO
+            self._geodata = self.GEO
         else:
             raise PygaarstRasterError(
                 "Unable to find georeference information for %s."
                 % self.filepath)
-        return geodat
+        return self._geodata
 
     @property
     def ascending_node(self):
         """True if scene is acquired on an ascending node, otherwise False."""
-        middlelatdelta = self.lats[-100, 3199] - self.lats[100, 3199]
+        # two values suffice; read them from the dataset unless the full
+        # latitude array is already in memory
+        if self._lats is not None:
+            latitude = self._lats
+        else:
+            latitude = self.geodata['Latitude']
+        middlelatdelta = float(latitude[-100, 3199]) - float(latitude[100, 3199])
         if abs(middlelatdelta) > 500:
             LOGGER.warning(
                 "Property 'ascending_node' of {} cannot be easily established. "
@@ -208,33 +241,74 @@ class VIIRSHDF5(HDF5):
             return False
         return True
 
+    def _readgeodataset(self, name):
+        """Reads a georeference dataset into a new numpy array"""
+        dataset = self.geodata[name]
+        arr = np.empty(dataset.shape, dtype=dataset.dtype)
+        dataset.read_direct(arr)
+        return arr
+
     @property
     def lats(self):
         """Latitudes as provided by georeference array"""
-        return self.geodata['Latitude'][:]
+        if self._lats is None:
+            self._lats = self._readgeodataset('Latitude')
+        return self._lats
 
     @property
     def lons(self):
         """Longitudes as provided by georeference array"""
-        return self.geodata['Longitude'][:]
+        if self._lons is None:
+            self._lons = self._readgeodataset('Longitude')
+        return self._lons
+
+    @property
+    def lats_ds(self):
+        """Latitude georeference h5py dataset, for reading subregions"""
+        return self.geodata['Latitude']
+
+    @property
+    def lons_ds(self):
+        """Longitude georeference h5py dataset, for reading subregions"""
+        return self.geodata['Longitude']
 
     def close(self):
-        """Closes open HDF5 file object"""
+        """Closes open HDF5 file objects"""
+        if self._geodata is not None:
+            self._geodata.file.close()
+            self._geodata = None
         self.dataobj.close()
-        self.geodata.file.close()
 
     def getdataset(self, datasetname):
-        return self.dataobj['All_Data'][self.longbandname][datasetname][:]
+        return self._alldata[self.longbandname][datasetname][:]
 
     @property
     def pixelquality(self):
         """Raster of quality factors"""
         return self.getdataset('QF1_VIIRSIBANDSDR')
 
-    def getnearestidx(self, latref, lonref):
-        """Returns 2D array index pair that is closest to a given lat/lon point"""
-        flatidx = _latlonmetric(self.lats, latref, self.lons, lonref).argmin()
-        return np.unravel_index(flatidx, self.lons.shape)
+    def getnearestidx(self, latref, lonref, window=None):
+        """Returns 2D array index pair that is closest to a given lat/lon point
+
+        Arguments:
+            window (optional): (starti, endi, startj, endj) index bounds
+              to restrict the search to, as returned by crop(). Unless the
+              full lat/lon arrays are already loaded, only this subregion is
+              read from the georeference datasets.
+        """
+        if window is None:
+            flatidx = _latlonmetric(
+                self.lats, latref, self.lons, lonref, squared=True).argmin()
+            return np.unravel_index(flatidx, self.lons.shape)
+        starti, endi, startj, endj = window
+        selection = np.s_[starti:endi, startj:endj]
+        if self._lats is not None and self._lons is not None:
+            lats, lons = self._lats[selection], self._lons[selection]
+        else:
+            lats, lons = self.lats_ds[selection], self.lons_ds[selection]
+        flatidx = _latlonmetric(lats, latref, lons, lonref, squared=True).argmin()
+        idx = np.unravel_index(flatidx, lats.shape)
+        return idx[0] + starti, idx[1] + startj
 
     def crop(self, latref, lonref, delx, dely=None):
         if not dely:
@@ -250,6 +324,23 @@ class VIIRSHDF5(HDF5):
         return starti, endi, startj, endj
 
 
+# GINA overpass directories are named YYYY_MM_DD_JJJ_hhmm
+SCENEDIRPATTERN = re.compile(r"20[0-1]\d_[0-1]\d_[0-3]\d_\d{3}_[0-2]\d[0-6]\d$")
+GRANULEPATTERN = re.compile(
+    r"(?P<ftype>[A-Z0-9]{5})_[a-z]+_d(?P<date>\d{8})_t(?P<time>\d{7})"
+    r"_e\d+_b(\d+)_c\d+_\w+.h5")
+
+
+def _listentries(dirpath):
+    """Sorted list of (name, isdir) pairs for the entries of a directory,
+    using the file type information cached by os.scandir where available"""
+    if scandir is None:
+        return sorted(
+            (name, os.path.isdir(os.path.join(dirpath, name)))
+            for name in os.listdir(dirpath))
+    return sorted((entry.name, entry.is_dir()) for entry in scandir(dirpath))
+
+
 def getVIIRSfilesbygranule(basedir, scenelist=[]):
     """
     Returns a dictionary that parses a list of scene directories where each
@@ -257,34 +348,30 @@ def getVIIRSfilesbygranule(basedir, scenelist=[]):
     multiple granules and individual desaggregated band files. GINA (the
     Geographic Information Network of Alaska) distributes data this way.
     """
-    regex = re.compile(r"(?P<ftype>[A-Z0-9]{5})_[a-z]+_d(?P<date>\d{8})_t(?P<time>\d{7})_e\d+_b(\d+)_c\d+_\w+.h5")
     if scenelist:
-        subdirs = list(filter(
-            os.path.isdir,
-            [os.path.join(basedir, item) for item in scenelist]))
+        subdirs = [
+            os.path.join(basedir, item) for item in scenelist
+            if os.path.isdir(os.path.join(basedir, item))]
     else:
-        subdirs = sorted(glob.glob(
-                basedir +
-                '/20[0-1][0-9]_[0-1][0-9]_[0-3][0-9]_' +
-                '[0-9][0-9][0-9]_[0-2][0-9][0-6][0-9]'))
+        subdirs = [
+            os.path.join(basedir, name)
+            for name, isdir in _listentries(basedir)
+            if isdir and SCENEDIRPATTERN.match(name)]
     overpasses = OrderedDict()
     for subdir in subdirs:
         basename = os.path.split(subdir)[-1]
         overpasses[basename] = {}
         overpasses[basename]['dir'] = os.path.join(subdir, 'sdr')
-        datafiles = sorted(
-            [item for item in os.listdir(overpasses[basename]['dir'])
-                if item.endswith('.h5')])
+        datafiles = [
+            name for name, _ in _listentries(overpasses[basename]['dir'])
+            if name.endswith('.h5')]
         if len(datafiles)%25 != 0:
             overpasses[basename]['message'] = "Some data files are missing in {}: {} is not divisible by 25".format(basename, len(datafiles))
-        numgran = len(datafiles)//25
-        mos = [regex.search(filename) for filename in datafiles]
-        for mo, fname in zip(mos, datafiles):
-            granulestr = mo.groupdict()['date'] + '_' + mo.groupdict()['time']
-            ftype = mo.groupdict()['ftype']
-            try:
-                overpasses[basename][granulestr][ftype] = fname
-            except KeyError:
-                overpasses[basename][granulestr] = {}
-                overpasses[basename][granulestr][ftype] = fname
+        for fname in datafiles:
+            mo = GRANULEPATTERN.search(fname)
+            if not mo:
+                continue
+            granulestr = mo.group('date') + '_' + mo.group('time')
+            overpasses[basename].setdefault(
+                granulestr, {})[mo.group('ftype')] = fname
     return overpasses
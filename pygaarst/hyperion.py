@@ -12,6 +12,7 @@ from builtins import str
 from builtins import range
 import datetime as dt
 import os
+import re
 import itertools
 import numpy as np
 
@@ -26,6 +27,29 @@ from pygaarst.usgsl1 import USGSL1scene, USGSL1band, _validate_platformorigin
 logging.basicConfig(level=logging.DEBUG)
 LOGGER = logging.getLogger('pygaarst.hyperion')
 
+# attribute names starting with band, in any capitalization: all of them
+# are band labels, and invalid ones raise PygaarstRasterError
+BANDPATTERN = re.compile(r'band(.*)$', re.IGNORECASE)
+
+
+def _toindexer(indices, size):
+    """Turns a row or column selection (None, slice or sequence of int) into
+    a slice with step 1 if it is contiguous, otherwise an integer array."""
+    if indices is None:
+        return slice(0, size)
+    if isinstance(indices, slice):
+        start, stop, step = indices.indices(size)
+        if step == 1:
+            return slice(start, stop)
+        return np.arange(start, stop, step)
+    indices = np.asarray(indices, dtype=int)
+    if indices.size == 0:
+        return slice(0, size)
+    if indices[0] >= 0 and np.array_equal(
+            indices, np.arange(indices[0], indices[0] + indices.size)):
+        return slice(int(indices[0]), int(indices[-1]) + 1)
+    return indices
+
 
 class Hyperionscene(USGSL1scene):
     """
@@ -46,6 +70,8 @@ class Hyperionscene(USGSL1scene):
         self.permissiblebandid = [str(num) for num in range(1, 243)]
         self.calibratedbandid = [
             str(num) for num in itertools.chain(list(range(8, 58)), list(range(77, 225)))]
+        self._bandlookup = dict(
+            ('band%s' % bandid, bandid) for bandid in self.permissiblebandid)
         _validate_platformorigin('HYPERION', self.spacecraft, self.sensor)
 
     def __getattr__(self, bandname):
@@ -59,32 +85,32 @@ class Hyperionscene(USGSL1scene):
         pre-processed bands.
         """
         # see https://eo1.usgs.gov/sensors/hyperioncoverage
-        isband = False
-        head, sep, tail = bandname.lower().partition('band')
-        try:
-            band = tail.upper()
-            if head == '':
-                if band in self.permissiblebandid:
-                    isband = True
-                    if band not in self.calibratedbandid:
-                        LOGGER.warning(
-                            'Hyperion band %s is not calibrated.' % band)
-                else:
-                    raise PygaarstRasterError(
-                        "EO-1 Hyperion does not have a band %s. " % band +
-                        "Permissible band labels are between 1 and 242.")
-        except ValueError:
-            pass
-        if isband:
-            keyname = "BAND%s_FILE_NAME" % band
-            bandfn = self.meta['PRODUCT_METADATA'][keyname]
-            base, ext = os.path.splitext(bandfn)
-            postprocessfn = base + self.infix + ext
-            bandpath = os.path.join(self.dirname, postprocessfn)
-            self.bands[band] = Hyperionband(bandpath, band=band, scene=self)
-            return self.bands[band]
-        else:
+        if bandname.startswith('_'):
+            # private and special attributes (copy, pickle, numpy protocol
+            # probes...) are never bands
             return object.__getattribute__(self, bandname)
+        # fast path: exact lower-case band labels, as in self.band50
+        band = self.__dict__.get('_bandlookup', {}).get(bandname)
+        if band is None:
+            mat = BANDPATTERN.match(bandname)
+            if not mat:
+                return object.__getattribute__(self, bandname)
+            band = mat.group(1).upper()
+            if band not in self.permissiblebandid:
+                raise PygaarstRasterError(
+                    "EO-1 Hyperion does not have a band %s. " % band +
+                    "Permissible band labels are between 1 and 242.")
+        keyname = "BAND%s_FILE_NAME" % band
+        bandfn = self.meta['PRODUCT_METADATA'][keyname]
+        base, ext = os.path.splitext(bandfn)
+        postprocessfn = base + self.infix + ext
+        bandpath = os.path.join(self.dirname, postprocessfn)
+        # reuse the band object unless the infix has changed since
+        if band not in self.bands or self.bands[band].filepath != bandpath:
+            if band not in self.calibratedbandid:
+                LOGGER.warning('Hyperion band %s is not calibrated.' % band)
+            self.bands[band] = Hyperionband(bandpath, band=band, scene=self)
+        return self.bands[band]
 
     def spectrum(
             self, i_idx, j_idx,
@@ -103,8 +129,11 @@ class Hyperionscene(USGSL1scene):
             'all': use all available bands
             'selected': use bdsel attribute or argument
           bdsel: sequence data type containing band indices to select
+
+        Returns:
+          float32 numpy array of radiances, one per band. Only the
+          selected pixel is read from each band file.
         """
-        rads = []
         if bands == 'calibrated':
             bnd = self.hyperionbands[self.band_is_calibrated]
         elif bands == 'selected':
@@ -121,10 +150,9 @@ class Hyperionscene(USGSL1scene):
             raise PygaarstRasterError(
                 "Unrecognized argument %s for bands " % bands +
                 "in raser.HyperionScene.")
-        for band in bnd:
-            rad = self.__getattr__(band).radiance
-            rads.append(rad[i_idx, j_idx])
-        del rad
+        rads = np.empty(len(bnd), dtype=np.float32)
+        for idx, band in enumerate(bnd):
+            rads[idx] = self.__getattr__(band).radiance_at(i_idx, j_idx)
         return rads
 
     def get_datacube(
@@ -138,32 +166,32 @@ class Hyperionscene(USGSL1scene):
         Arguments:
             outfn (str): file path of the HDF5 file that stores the cube
             bandlist (sequence of str): a list or array of band names
-            islice (sequence of int): list or array of row indices
-            jslice (sequence of int): list or array of column indices
+            islice (slice or sequence of int): row selection
+            jslice (slice or sequence of int): column selection
             set_fh (bool): should an open filehandle be set as an argument?
         """
         if len(bandlist) == 0:
             return None
         sampleband = self.__getattr__(bandlist[0])
-        if not islice:
-            islice = list(range(sampleband.nrow))
-        if not jslice:
-            jslice = list(range(sampleband.ncol))
+        rows = _toindexer(islice, sampleband.nrow)
+        cols = _toindexer(jslice, sampleband.ncol)
         revnorth = sampleband.northing[::-1]
         east = sampleband.easting[...]
         scenecube = rh.Datacube(
             outfn,
             self.calibratedbands,
             self.calibratedwavelength_nm,
-            east[jslice],
-            revnorth[islice],
+            east[cols],
+            revnorth[rows],
             proj4=sampleband.proj4,
             set_fh=True
         )
+        cubedata = scenecube.fh['data']
+        # one contiguous buffer, reused for every band plane
+        buf = np.empty(cubedata.shape[:2], dtype=np.float32)
         for bidx, band in enumerate(bandlist):
-            banddata = self.__getattr__(band).radiance
-            scenecube.fh['data'][:, :, bidx] = banddata[
-                np.meshgrid(islice, jslice)]
+            buf[...] = self.__getattr__(band).radiance_subset(rows, cols).T
+            cubedata.write_direct(buf, dest_sel=np.s_[:, :, bidx])
         if not set_fh:
             scenecube.fh.close()
         return scenecube
@@ -176,22 +204,81 @@ class Hyperionband(USGSL1band):
     def __init__(self, filepath, band=None, scene=None):
         super(Hyperionband, self).__init__(filepath, band=band, scene=scene)
         _validate_platformorigin('HYPERION', self.spacecraft, self.sensor)
+        self._radiance = None
+        # the scaling factor is fixed per band: resolved on first use
+        self._invscale = None
 
     @property
     def radiance(self):
         """Radiance in W / um / m^2 / sr derived from digital number and
-        metadata, as numpy array"""
-        if not self.meta:
+        metadata, as read-only float32 numpy array. Computed on first
+        access only."""
+        if self._radiance is None:
+            invscale = self._inversescale()
+            # single pass straight into a float32 array, no float64 temporary
+            self._radiance = rh._readonly(np.multiply(
+                self.data, invscale, dtype=np.float32))
+        return self._radiance
+
+    def radiance_at(self, i_idx, j_idx):
+        """Radiance in W / um / m^2 / sr at a single pixel. Only that pixel
+        is read from disk."""
+        if i_idx < 0:
+            i_idx += self.nrow
+        if j_idx < 0:
+            j_idx += self.ncol
+        if rh._test_outside(i_idx, 0, self.nrow - 1) or rh._test_outside(
+                j_idx, 0, self.ncol - 1):
             raise PygaarstRasterError(
-                "Impossible to retrieve metadata " +
-                "for band. No radiance calculation possible.")
-        if int(self.band) <= 70:
-            rad = self.data / self.meta[
-                'RADIANCE_SCALING']['SCALING_FACTOR_VNIR']
+                "Coordinates %d, %d out of bounds" % (i_idx, j_idx))
+        invscale = self._inversescale()
+        dn = self._ensure_open().ReadAsArray(int(j_idx), int(i_idx), 1, 1)
+        return np.multiply(dn[0, 0], invscale, dtype=np.float32)
+
+    def radiance_subset(self, islice=None, jslice=None):
+        """Radiance in W / um / m^2 / sr for a selection of rows and
+        columns (slices or sequences of indices). Contiguous selections are
+        read from disk as a window; only the subset is converted to float32.
+        """
+        rows = _toindexer(islice, self.nrow)
+        cols = _toindexer(jslice, self.ncol)
+        invscale = self._inversescale()
+        if isinstance(rows, slice) and isinstance(cols, slice):
+            if self._radiance is not None:
+                return self._radiance[rows, cols]
+            dn = self._ensure_open().ReadAsArray(
+                int(cols.start), int(rows.start),
+                int(cols.stop - cols.start), int(rows.stop - rows.start))
         else:
-            rad = self.data / self.meta[
-                'RADIANCE_SCALING']['SCALING_FACTOR_SWIR']
-        return rad.astype('float32')
+            # open mesh of row and column indices, not two full grids
+            mesh = np.ix_(
+                np.arange(self.nrow)[rows], np.arange(self.ncol)[cols])
+            if self._radiance is not None:
+                return self._radiance[mesh]
+            dn = self.data[mesh]
+        return np.multiply(dn, invscale, dtype=np.float32)
+
+    def _inversescale(self):
+        """Inverse of the band's radiance scaling factor (VNIR or SWIR),
+        as float32"""
+        if self._invscale is None:
+            if not self.meta:
+                raise PygaarstRasterError(
+                    "Impossible to retrieve metadata " +
+                    "for band. No radiance calculation possible.")
+            if int(self.band) <= 70:
+                factorkey = 'SCALING_FACTOR_VNIR'
+            else:
+                factorkey = 'SCALING_FACTOR_SWIR'
+            try:
+                scalingfactor = self.meta['RADIANCE_SCALING'][factorkey]
+            except KeyError:
+                raise PygaarstRasterError(
+                    "No RADIANCE_SCALING %s in metadata " % factorkey +
+                    "for band %s. No radiance calculation possible." %
+                    self.band)
+            self._invscale = np.float32(1.0 / scalingfactor)
+        return self._invscale
 
     @property
     def reflectance(self):
@@ -11,41 +11,73 @@ from __future__ import division, print_function
 import os
 import numpy as np
 
+# The band tables are static: parsed on first use, then kept per process
+_HYPERIONBANDS = None
+_HYPERIONIRRADIANCE = None
+
+
+def _loadtable(tabfile, fields, bandprefix):
+    """Parses a tab-separated Hyperion table with a comment and a header
+    line into a numpy record array, renaming band labels to 'bandN'"""
+    table = np.loadtxt(
+        tabfile,
+        delimiter='\t',
+        skiprows=2,
+        dtype=fields,
+        encoding='utf-8'
+    ).view(np.recarray)
+    bandfield = fields[0][0]
+    table[bandfield] = np.char.replace(table[bandfield], bandprefix, 'band')
+    table.setflags(write=False)
+    return table
+
 
 def gethyperionbands():
     """
     Load Hyperion spectral band values into Numpy structured array.
     Source: http://eo1.usgs.gov/sensors/hyperioncoverage
+
+    The array is shared between calls and is read-only.
     """
-    def converter(bandname):
-        return bandname.decode('utf-8').replace('B', 'band')
+    global _HYPERIONBANDS
+    if _HYPERIONBANDS is not None:
+        return _HYPERIONBANDS
     this_dir, _ = os.path.split(__file__)
-    tabfile = os.path.join(this_dir, 'data', 'Hyperion_Spectral_coverage.tab')
-    return np.recfromtxt(
+    tabfile = os.path.join(this_dir, 'data', 'Hyperion_Spectral_Coverage.tab')
+    _HYPERIONBANDS = _loadtable(
         tabfile,
-        delimiter='\t',
-        skip_header=1,
-        names=True,
-        dtype=('U7', 'f8', 'f8', 'i8', 'U1'),
-        converters={0: converter}
+        [
+            ('Hyperion_Band', 'U7'),
+            ('Average_Wavelength_nm', 'f8'),
+            ('Full_Width_at_Half_the_Maximum_FWHM_nm', 'f8'),
+            ('Spatial_Resolution_m', 'i8'),
+            ('Not_Calibrated_X', 'U1'),
+        ],
+        'B'
     )
+    return _HYPERIONBANDS
 
 
 def gethyperionirradiance():
-    """Load Hyperion spectral irradiance into Numpy array"""
-    def converter(bandname):
-        return bandname.decode('utf-8').replace('b', 'band')
+    """Load Hyperion spectral irradiance into Numpy array.
+
+    The array is shared between calls and is read-only."""
+    global _HYPERIONIRRADIANCE
+    if _HYPERIONIRRADIANCE is not None:
+        return _HYPERIONIRRADIANCE
     this_dir, _ = os.path.split(__file__)
     tabfile = os.path.join(
         this_dir, 'data', 'Hyperion_Spectral_Irradiance.txt')
-    return np.recfromtxt(
+    _HYPERIONIRRADIANCE = _loadtable(
         tabfile,
-        delimiter='\t',
-        skip_header=1,
-        names=True,
-        dtype=('U7', 'f8', 'f8'),
-        converters={0: converter}
+        [
+            ('Hyperion_band', 'U7'),
+            ('Central_wavelength_nm', 'f8'),
+            ('Spectral_irradiance_Wm2mu', 'f8'),
+        ],
+        'b'
     )
+    return _HYPERIONIRRADIANCE
 
 
 def getesun(band):
@@ -66,7 +98,8 @@ def find_nearest_hyp(wavelength):
       band (str): band name of closest band, starting at 'band1'
       bandwavelength (float): closest band wavelength in nm
     """
-    bands = gethyperionbands().Hyperion_Band
-    wavs = gethyperionbands().Average_Wavelength_nm
+    hypbands = gethyperionbands()
+    bands = hypbands.Hyperion_Band
+    wavs = hypbands.Average_Wavelength_nm
     idx = (np.abs(wavs - wavelength)).argmin()
     return idx, bands[idx], wavs[idx]
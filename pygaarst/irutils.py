@@ -21,6 +21,13 @@ KtoC = 273.15
 h = 6.626068e-34  # Planck's constant, m^2 kg / s
 c = 2.99792e8 # speed of light, m / s
 kB = 1.38065e-23 # Boltzmann's constant, m^2 kg / s^2 / K
+# Planck's law radiation constants, folded once
+_C1 = 1.0e-6 * 2 * h * c**2 # 2hc^2, scaled to radiance per micrometre
+_C2 = h * c / kB # hc/kB, m K
+
+# Strip height for tiled normalized differences: for scene-wide rasters
+# (~7500 columns) a few strips of float32 fit into L2 cache
+NORMDIFFROWS = 16
 
 # Helpers
 class _FPErr_Log(object):
@@ -31,6 +38,20 @@ class _FPErr_Log(object):
         """Writes log message"""
         LOGGER.warning("%s: %s" % (self.custmsg, errmsg))
 
+_NORMDIFF_LOG = _FPErr_Log(
+    "NaN generated while calculating normalized difference index")
+
+def _outarray(data, *scalars):
+    """Uninitialized output array shaped like data, with the float dtype
+    the equivalent numpy expression would have"""
+    # lists and tuples would be read as dtype specs by result_type
+    data = np.asanyarray(data)
+    return np.empty(data.shape, dtype=np.result_type(data, 1.0, *scalars))
+
+def _unwrap(out):
+    """Returns 0-d results as numpy scalars, like plain ufunc expressions"""
+    return out[()] if out.ndim == 0 else out
+
 # Functions
 def gainbias(lmax, lmin, qcalmax, qcalmin):
     """Calculates gain and bias from max and min radiance"""
@@ -38,27 +59,78 @@ def gainbias(lmax, lmin, qcalmax, qcalmin):
     bias = (qcalmax*lmin - qcalmin*lmax)/(qcalmax - qcalmin)
     return gain, bias
 
-def dn2rad(data, gain, bias):
-    """Converts digital number array to radiance"""
-    return data * gain + bias
+def dn2rad(data, gain, bias, out=None):
+    """Converts digital number array to radiance
+
+    If given, the result is written to the float array out (which may be
+    data itself) instead of a newly allocated one."""
+    rad = _outarray(data, gain, bias) if out is None else out
+    np.multiply(data, gain, out=rad)
+    rad += bias
+    return _unwrap(rad)
 
 def rad2kelvin(data, k1, k2):
     """Converts radiance array to temperature in Kelvin"""
-    return np.divide(k2, np.log(np.divide(k1, data) + 1))
+    # all steps in one output buffer, no intermediate arrays
+    temp = _outarray(data, k1, k2)
+    np.divide(k1, data, out=temp)
+    np.log1p(temp, out=temp)
+    np.divide(k2, temp, out=temp)
+    return _unwrap(temp)
+
+def dn2kelvin(data, gain, bias, k1, k2):
+    """Converts digital number array to temperature in Kelvin, without
+    an intermediate radiance array"""
+    temp = _outarray(data, gain, bias, k1, k2)
+    np.multiply(data, gain, out=temp)
+    temp += bias
+    np.divide(k1, temp, out=temp)
+    np.log1p(temp, out=temp)
+    np.divide(k2, temp, out=temp)
+    return _unwrap(temp)
 
 def rad2celsius(data, k1, k2, ktoc=KtoC):
     """Converts radiance array to temperature in Celsius"""
-    return rad2kelvin(data, k1, k2) - ktoc
-
-def normdiff(array1, array2):
-    """Calculates normalized difference index array from input arrays"""
-    log = _FPErr_Log(
-        "NaN generated while calculating normalized difference index: ")
-    np.seterrcall(log)
-    np.seterr(invalid='log')
-    normalizeddiff = np.divide(
-        array1.astype(np.float32) - array2.astype(np.float32),
-        array1.astype(np.float32) + array2.astype(np.float32))
+    temp = rad2kelvin(data, k1, k2)
+    temp -= ktoc
+    return temp
+
+def normdiff(array1, array2, out=None, tilerows=None):
+    """Calculates normalized difference index array from input arrays
+
+    If given, the result is written to the float32 array out, so that a
+    buffer can be reused when processing many scenes. With tilerows, arrays
+    of equal shape are processed in strips of that many rows, so that only
+    a strip-sized denominator is needed and each strip stays in cache."""
+    if (tilerows is None or np.ndim(array1) == 0
+            or np.shape(array1) != np.shape(array2)):
+        # untiled, also for inputs that broadcast against each other
+        if out is None:
+            # 0-d inputs come back as numpy scalars, as before
+            return _unwrap(_normdiffstrip(array1, array2, np.empty(
+                np.broadcast(array1, array2).shape, dtype=np.float32)))
+        return _normdiffstrip(array1, array2, out)
+    nrows = len(array1)
+    if out is None:
+        out = np.empty(np.shape(array1), dtype=np.float32)
+    denominator = np.empty(
+        (min(tilerows, nrows),) + np.shape(array1)[1:], dtype=np.float32)
+    for row in range(0, nrows, tilerows):
+        strip = slice(row, row + tilerows)
+        _normdiffstrip(
+            array1[strip], array2[strip], out[strip], denominator)
+    return out
+
+def _normdiffstrip(array1, array2, out=None, denominator=None):
+    """Normalized difference of two arrays, see normdiff"""
+    # the ufuncs cast the inputs to float32 on the fly: two arrays in total
+    normalizeddiff = np.subtract(array1, array2, out=out, dtype=np.float32)
+    if denominator is not None:
+        denominator = denominator[:len(normalizeddiff)]
+    denominator = np.add(array1, array2, out=denominator, dtype=np.float32)
+    # NaNs (0/0) are logged, without touching the global error handling
+    with np.errstate(divide='ignore', invalid='log', call=_NORMDIFF_LOG):
+        np.divide(normalizeddiff, denominator, out=normalizeddiff)
     return normalizeddiff
 
 def specrad(lamb, T):
@@ -67,7 +139,15 @@ def specrad(lamb, T):
 
     Spectral radiance in W/m^2/um/sr; T in K; lambda in micrometres
     """
-    lamb = lamb * 1.0e-6 # convert from micrometres to metres
-    rad = 1.0e-6 * (2*h*c**2) / (lamb**5*(np.exp((h*c)/(lamb*kB*T)) - 1))
-    return rad
+    lamb = np.multiply(lamb, 1.0e-6) # convert from micrometres to metres
+    # evaluated in place in one buffer of the broadcast shape of lamb and T
+    rad = np.empty(
+        np.broadcast(lamb, T).shape, dtype=np.result_type(lamb, T, 1.0))
+    np.multiply(lamb, T, out=rad)
+    np.divide(_C2, rad, out=rad)
+    # expm1 is exact where exp(x) - 1 would cancel for small x
+    np.expm1(rad, out=rad)
+    rad *= lamb**5
+    np.divide(_C1, rad, out=rad)
+    return _unwrap(rad)
 
@@ -9,6 +9,7 @@
 
 from __future__ import division, print_function, absolute_import
 import os.path, datetime
+import re
 import numpy as np
 
 import logging
@@ -17,9 +18,14 @@ LOGGER = logging.getLogger('pygaarst.landsat')
 
 import pygaarst.irutils as ir
 import pygaarst.landsatutils as lu
+import pygaarst.rasterhelpers as rh
 from pygaarst.rasterhelpers import PygaarstRasterError
 from pygaarst.usgsl1 import USGSL1scene, USGSL1band, _validate_platformorigin
 
+# attribute names starting with band, in any capitalization: all of them
+# are band labels, and invalid ones raise PygaarstRasterError
+BANDPATTERN = re.compile(r'band(.*)$', re.IGNORECASE)
+
 class Landsatscene(USGSL1scene):
     """
     A container object for TM/ETM+ L5/7 and OLI/TIRS L8 scenes
@@ -38,29 +44,10 @@ class Landsatscene(USGSL1scene):
             self.newmetaformat = False
         self.permissiblebandid = lu.get_bands(self.spacecraft)
         _validate_platformorigin('Landsat', self.spacecraft)
-
-    def __getattr__(self, bandname):
-        """
-        Overrides _gettattr__() for bandnames bandN with N in l.LANDSATBANDS.
-        Allows for infixing the filename just before the .TIF extension for
-        pre-processed bands.
-        """
-        isband = False
-        head, sep, tail = bandname.lower().partition('band')
-        try:
-            band = tail.upper()
-            if head == '':
-                if band in self.permissiblebandid:
-                    isband = True
-                else:
-                    raise PygaarstRasterError(
-                        "Spacecraft %s " % self.spacecraft
-                        + "does not have a band %s. " % band
-                        + "Permissible band labels are %s."
-                        % ', '.join(self.permissiblebandid))
-        except ValueError:
-            pass
-        if isband:
+        # band file names, looked up in the metadata once
+        self._bandfilenames = {}
+        self._bandlookup = {}
+        for band in self.permissiblebandid or []:
             # Note: Landsat 7 has low and high gain bands 6,
             # with different label names
             if self.newmetaformat:
@@ -69,14 +56,45 @@ class Landsatscene(USGSL1scene):
             else:
                 bandstr = band.replace('L', '1').replace('H', '2')
                 keyname = "BAND%s_FILE_NAME" % bandstr
-            bandfn = self.meta['PRODUCT_METADATA'][keyname]
-            base, ext = os.path.splitext(bandfn)
-            postprocessfn = base + self.infix + ext
-            bandpath = os.path.join(self.dirname, postprocessfn)
-            self.bands[band] = Landsatband(bandpath, band=band, scene=self)
-            return self.bands[band]
-        else:
+            if keyname in self.meta['PRODUCT_METADATA']:
+                self._bandfilenames[band] = self.meta['PRODUCT_METADATA'][keyname]
+            self._bandlookup['band%s' % band] = band
+
+    def __getattr__(self, bandname):
+        """
+        Overrides _gettattr__() for bandnames bandN with N in l.LANDSATBANDS.
+        Allows for infixing the filename just before the .TIF extension for
+        pre-processed bands.
+        """
+        if bandname.startswith('_'):
             return object.__getattribute__(self, bandname)
+        # fast path: band labels as in self.band4 or self.band6H
+        band = self.__dict__.get('_bandlookup', {}).get(bandname)
+        if band is None:
+            mat = BANDPATTERN.match(bandname)
+            if not mat:
+                return object.__getattribute__(self, bandname)
+            band = mat.group(1).upper()
+        return self.get_band(band)
+
+    def get_band(self, band):
+        """
+        Returns the Landsatband object for a band label such as '4' or '6H'.
+        """
+        if band not in self.permissiblebandid:
+            raise PygaarstRasterError(
+                "Spacecraft %s " % self.spacecraft
+                + "does not have a band %s. " % band
+                + "Permissible band labels are %s."
+                % ', '.join(self.permissiblebandid))
+        bandfn = self._bandfilenames[band]
+        base, ext = os.path.splitext(bandfn)
+        postprocessfn = base + self.infix + ext
+        bandpath = os.path.join(self.dirname, postprocessfn)
+        # reuse the band object unless the infix has changed since
+        if band not in self.bands or self.bands[band].filepath != bandpath:
+            self.bands[band] = Landsatband(bandpath, band=band, scene=self)
+        return self.bands[band]
 
     @property
     def NDVI(self):
@@ -85,7 +103,7 @@ class Landsatscene(USGSL1scene):
         try:
             arr1 = self.__getattr__(label1).data
             arr2 = self.__getattr__(label2).data
-            return ir.normdiff(arr1, arr2)
+            return ir.normdiff(arr1, arr2, tilerows=ir.NORMDIFFROWS)
         except AttributeError:
             LOGGER.critical(
                 "Error accessing bands %s and %s " % (label1, label2)
@@ -102,7 +120,7 @@ class Landsatscene(USGSL1scene):
             else:
                 arr1 = self.__getattr__(label1).data
                 arr2 = self.__getattr__(label2).data
-            return ir.normdiff(arr1, arr2)
+            return ir.normdiff(arr1, arr2, tilerows=ir.NORMDIFFROWS)
         except AttributeError:
             LOGGER.critical(
                 "Error accessing bands %s and %s " % (label1, label2)
@@ -125,13 +143,13 @@ class Landsatscene(USGSL1scene):
         (doi:10.1109/LGRS.2010.2095409).
 
         Returns:
-          A numpy array of the same shape as the input data
+          A numpy uint8 array of the same shape as the input data
           The classes signify:
-          - 1.0 - bare ground
-          - 2.0 - ice/snow
-          - 3.0 - water
-          - 4.0 - cloud
-          - 5.0 - vegetated soil"""
+          - 1 - bare ground
+          - 2 - ice/snow
+          - 3 - water
+          - 4 - cloud
+          - 5 - vegetated soil"""
         return lu.LTKcloud(self)
 
     @property
@@ -153,6 +171,15 @@ class Landsatband(USGSL1band):
     def __init__(self, filepath, band=None, scene=None):
         super(Landsatband, self).__init__(filepath, band=band, scene=scene)
         _validate_platformorigin('Landsat', self.spacecraft)
+        self._radiance = None
+        self._reflectance = None
+        self._tkelvin = None
+
+    def clear_cache(self):
+        """Drops the cached radiance, reflectance and temperature arrays"""
+        self._radiance = None
+        self._reflectance = None
+        self._tkelvin = None
 
     @property
     def newmetaformat(self):
@@ -172,11 +199,9 @@ class Landsatband(USGSL1band):
                     + "Set it explicitly: [bandobject].meta = "
                     + "pygaarst.mtlutils.parsemeta([metadatafile])")
 
-    @property
-    def radiance(self):
-        """
-        Radiance in W/um/m^2/sr derived from DN and metadata, as numpy array
-        """
+    def _radiancegainbias(self):
+        """Gain and bias converting DN to radiance, from metadata, as float32
+        so that the derived arrays stay float32 as well"""
         if not self.meta:
             raise PygaarstRasterError(
                 "Impossible to retrieve metadata for band. "
@@ -184,30 +209,45 @@ class Landsatband(USGSL1band):
         if self.spacecraft == 'L8':
             self.gain = self.meta['RADIOMETRIC_RESCALING']['RADIANCE_MULT_BAND_%s' % self.band]
             self.bias = self.meta['RADIOMETRIC_RESCALING']['RADIANCE_ADD_BAND_%s' % self.band]
-            return ir.dn2rad(self.data, self.gain, self.bias)
+            return np.float32(self.gain), np.float32(self.bias)
         elif self.newmetaformat:
             bandstr = self.band.replace('L', '_VCID_1').replace('H', '_VCID_2')
             lmax = self.meta['MIN_MAX_RADIANCE']['RADIANCE_MAXIMUM_BAND_%s' % bandstr]
             lmin = self.meta['MIN_MAX_RADIANCE']['RADIANCE_MINIMUM_BAND_%s' % bandstr]
             qcalmax = self.meta['MIN_MAX_PIXEL_VALUE']['QUANTIZE_CAL_MAX_BAND_%s' % bandstr]
             qcalmin = self.meta['MIN_MAX_PIXEL_VALUE']['QUANTIZE_CAL_MIN_BAND_%s' % bandstr]
-            gain, bias = ir.gainbias(lmax, lmin, qcalmax, qcalmin)
-            return ir.dn2rad(self.data, gain, bias)
         else:
             bandstr = self.band.replace('L', '1').replace('H', '2')
             lmax = self.meta['MIN_MAX_RADIANCE']['LMAX_BAND%s' % bandstr]
             lmin = self.meta['MIN_MAX_RADIANCE']['LMIN_BAND%s' % bandstr]
             qcalmax = self.meta['MIN_MAX_PIXEL_VALUE']['QCALMAX_BAND%s' % bandstr]
             qcalmin = self.meta['MIN_MAX_PIXEL_VALUE']['QCALMIN_BAND%s' % bandstr]
-            gain, bias = ir.gainbias(lmax, lmin, qcalmax, qcalmin)
-            return ir.dn2rad(self.data, gain, bias)
-        return None
+        gain, bias = ir.gainbias(lmax, lmin, qcalmax, qcalmin)
+        return np.float32(gain), np.float32(bias)
+
+    @property
+    def radiance(self):
+        """
+        Radiance in W/um/m^2/sr derived from DN and metadata, as read-only
+        float32 numpy array
+        """
+        if self._radiance is None:
+            gain, bias = self._radiancegainbias()
+            self._radiance = rh._readonly(ir.dn2rad(self.data, gain, bias))
+        return self._radiance
 
     @property
     def reflectance(self):
         """
-        Reflectance (0 .. 1) derived from DN and metadata, as numpy array
+        Reflectance (0 .. 1) derived from DN and metadata, as read-only
+        float32 numpy array
         """
+        if self._reflectance is None:
+            self._reflectance = rh._readonly(self._calcreflectance())
+        return self._reflectance
+
+    def _calcreflectance(self):
+        """Computes the reflectance array, see reflectance"""
         if not self.meta:
             raise PygaarstRasterError(
                 "Impossible to retrieve metadata for band. "
@@ -216,8 +256,10 @@ class Landsatband(USGSL1band):
             self.gain = self.meta['RADIOMETRIC_RESCALING']['REFLECTANCE_MULT_BAND_%s' % self.band]
             self.bias = self.meta['RADIOMETRIC_RESCALING']['REFLECTANCE_ADD_BAND_%s' % self.band]
             sedeg = self.meta['IMAGE_ATTRIBUTES']['SUN_ELEVATION']
-            rawrad = ir.dn2rad(self.data, self.gain, self.bias)
-            return rawrad/(np.sin(sedeg*np.pi/180))
+            refl = ir.dn2rad(
+                self.data, np.float32(self.gain), np.float32(self.bias))
+            refl *= np.float32(1.0 / np.sin(np.deg2rad(sedeg)))
+            return refl
         elif self.spacecraft in ['L5', 'L7']:
             if self.newmetaformat:
                 sedeg = self.meta['IMAGE_ATTRIBUTES']['SUN_ELEVATION']
@@ -228,15 +270,24 @@ class Landsatband(USGSL1band):
             juliandac = int(datetime.date.strftime(dac, '%j'))
             d = lu.getd(juliandac)
             esun = lu.getesun(self.spacecraft, self.band)
-            rad = self.radiance
-            return (np.pi * d * d * rad)/(esun * np.sin(sedeg*np.pi/180))
+            # scalar factors folded first: one pass over the (cached,
+            # therefore not modified) radiance array
+            coef = np.float32(
+                np.pi * d * d / (esun * np.sin(np.deg2rad(sedeg))))
+            return np.multiply(self.radiance, coef)
         else:
             return None
 
     @property
     def tKelvin(self):
         """Radiant (brightness) temperature at the sensor in K,
-        implemented for Landsat thermal infrared bands."""
+        implemented for Landsat thermal infrared bands. Read-only array."""
+        if self._tkelvin is None:
+            self._tkelvin = rh._readonly(self._calctkelvin())
+        return self._tkelvin
+
+    def _calctkelvin(self):
+        """Computes the brightness temperature array, see tKelvin"""
         if not self.scene:
             raise PygaarstRasterError(
                 "Impossible to retrieve metadata for band. "
@@ -252,4 +303,7 @@ class Landsatband(USGSL1band):
             self.k2 = self.meta['TIRS_THERMAL_CONSTANTS']['K2_CONSTANT_BAND_%s' % self.band]
         elif self.spacecraft in ['L4', 'L5', 'L7']:
             self.k1, self.k2 = lu.getKconstants(self.spacecraft)
-        return ir.rad2kelvin(self.radiance, self.k1, self.k2)
+        # DN to temperature in one pass, without a radiance array
+        gain, bias = self._radiancegainbias()
+        return ir.dn2kelvin(
+            self.data, gain, bias, np.float32(self.k1), np.float32(self.k2))
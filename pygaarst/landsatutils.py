@@ -14,6 +14,8 @@ import logging
 logging.basicConfig(level=logging.DEBUG)
 LOGGER = logging.getLogger('pygaarst.landsatutils')
 
+from pygaarst.rasterhelpers import PygaarstRasterError
+
 # ================================
 # = Landsat parameters for bands =
 # ================================
@@ -79,18 +81,31 @@ K2_L5_TM = 1260.56
 K1_L7_EMTplus = 666.09
 K2_L7_EMTplus = 1282.71
 
+KCONSTANTS = {
+    'L4': (K1_L4_TM, K2_L4_TM),
+    'L5': (K1_L5_TM, K2_L5_TM),
+    'L7': (K1_L7_EMTplus, K2_L7_EMTplus)
+    }
+
 def getKconstants(spacecraftid):
-    """Returns K1 and K2 constants for TIR conversion"""
-    if spacecraftid == 'L4':
-        return K1_L4_TM, K2_L4_TM
-    elif spacecraftid == 'L5':
-        return K1_L5_TM, K2_L5_TM
-    elif spacecraftid == 'L7':
-        return K1_L7_EMTplus, K2_L7_EMTplus
-    else:
+    """Returns K1 and K2 constants for TIR conversion. For a sequence of
+    spacecraft IDs, returns an array of K1 and an array of K2 values."""
+    if np.ndim(spacecraftid) == 0:
+        try:
+            return KCONSTANTS[spacecraftid]
+        except KeyError:
+            logging.warning(
+                "SpacecraftID not in L4, L5, L7."
+                + "Check metadata or spacecraftID. Or both.")
+            return None
+    constants = np.array(
+        [KCONSTANTS.get(item, (np.nan, np.nan)) for item in spacecraftid],
+        dtype=float).reshape(-1, 2)
+    if np.isnan(constants).any():
         logging.warning(
             "SpacecraftID not in L4, L5, L7."
             + "Check metadata or spacecraftID. Or both.")
+    return constants[:, 0], constants[:, 1]
 
 TIR_BANDS = {
     'L4': 'band6',
@@ -485,6 +500,9 @@ DISTEARTHSUN = {
     365: 0.98333,
     366: 0.98331
     }
+# the same indexed by julian day (index 0 unused), for vectorized lookups
+DISTEARTHSUNARR = np.array(
+    [np.nan] + [DISTEARTHSUN[day] for day in range(1, 367)])
 
 ESUN = {
     'L7': {
@@ -508,12 +526,23 @@ ESUN = {
 }
 
 def getd(julianday):
-    """Returns distance Earth-Sun for a Julian day"""
-    return DISTEARTHSUN[julianday]
+    """Returns distance Earth-Sun for a Julian day, or an array of distances
+    for an array of Julian days"""
+    if np.ndim(julianday) == 0:
+        return DISTEARTHSUN[julianday]
+    julianday = np.asarray(julianday)
+    if julianday.size and (julianday.min() < 1 or julianday.max() > 366):
+        raise KeyError("Julian days must be between 1 and 366.")
+    return DISTEARTHSUNARR[julianday]
 
 def getesun(spacecraft, band):
-    """Returns solar exoatmospheric spectral irradiances (ESUN)"""
-    return ESUN[spacecraft][band]
+    """Returns solar exoatmospheric spectral irradiances (ESUN). Sequences
+    of spacecraft IDs and/or band labels give an array of values."""
+    if np.ndim(spacecraft) == 0 and np.ndim(band) == 0:
+        return ESUN[spacecraft][band]
+    return np.array(
+        [ESUN[craft][bnd] for craft, bnd in np.broadcast(spacecraft, band)],
+        dtype=float).reshape(np.broadcast(spacecraft, band).shape)
 
 # =========================================
 # = Landsat vegetation indices parameters =
@@ -537,16 +566,26 @@ NBR_BANDS = {
 # = Cloud masking algorithms for Landsat =
 # ========================================
 
+# Rows per strip for the LTK classification
+LTKROWS = 64
+
 def naivethermal(tirband, tbright=280.):
     """
-    Takes LandsatBand object, must be TIR to make sense. Returns numpy array
+    Takes LandsatBand object, must be TIR to make sense. Returns numpy uint8
+    array, 1 where the brightness temperature is below tbright, else 0
     """
-    out = np.zeros(tirband.data.shape)
-    out[tirband.tKelvin < tbright] = 1.
-    return out
-
-def LTKcloud(lsc):
-    """Luo–Trishchenko–Khlopenkov"""
+    # comparison written straight into the result, in one pass and
+    # without reading the band data again for its shape
+    tkelvin = tirband.tKelvin
+    return np.less(
+        tkelvin, tbright, out=np.empty(np.shape(tkelvin), dtype=np.uint8))
+
+def LTKcloud(lsc, out=None):
+    """Luo–Trishchenko–Khlopenkov. Returns numpy uint8 array of classes 1-5
+
+    If given, the classes are written to out, a numpy array of the scene's
+    shape with a dtype that holds uint8 (eg. uint8, int16 or float32), so
+    that a buffer can be reused when processing many scenes."""
     if lsc.spacecraft == 'L8':
         d1, d3 = lsc.band2.reflectance, lsc.band4.reflectance
         d4, d5 = lsc.band5.reflectance, lsc.band6.reflectance
@@ -554,6 +593,33 @@ def LTKcloud(lsc):
         d1, d3 = lsc.band1.reflectance, lsc.band3.reflectance
         d4, d5 = lsc.band4.reflectance, lsc.band5.reflectance
 
+    # classified in strips of rows, so that the mask temporaries stay small;
+    # the thresholds need no more than float32 (a no-op for Landsat bands)
+    if out is None:
+        out = np.empty(np.shape(d1), dtype=np.uint8)
+    elif not isinstance(out, np.ndarray):
+        raise TypeError(
+            "out must be a numpy array, not %s" % type(out).__name__)
+    elif out.shape != np.shape(d1):
+        raise PygaarstRasterError(
+            "Output array has shape %s, " % (out.shape,)
+            + "scene bands have shape %s." % (np.shape(d1),))
+    elif not np.can_cast(np.uint8, out.dtype):
+        raise PygaarstRasterError(
+            "Output array of dtype %s " % out.dtype
+            + "cannot hold the uint8 cloud classes.")
+    for row in range(0, len(out), LTKROWS):
+        strip = slice(row, row + LTKROWS)
+        _LTKclasses(
+            np.asarray(d1[strip], dtype=np.float32),
+            np.asarray(d3[strip], dtype=np.float32),
+            np.asarray(d4[strip], dtype=np.float32),
+            np.asarray(d5[strip], dtype=np.float32),
+            out[strip])
+    return out
+
+def _LTKclasses(d1, d3, d4, d5, out):
+    """Writes the LTKcloud classes for reflectance arrays d1 to d5 into out"""
     # calculate masks
     dummy1 = np.logical_and(
         d1 < d3, np.logical_and(
@@ -578,18 +644,10 @@ def LTKcloud(lsc):
     mask_cloud = np.logical_and(
         dummy7, np.logical_and(d5 > 0.16, np.maximum(d1, d3) > d5 * 0.67))
 
-    # apply masks to array
-    out = np.zeros(d1.shape)
-    out[mask_bareland] = 1.
-    nextmask = np.logical_and(~mask_bareland, mask_ice)
-    out[nextmask] = 2.
-    union = np.logical_or(mask_bareland, mask_ice)
-    nextmask = np.logical_and(~union, mask_water)
-    out[nextmask] = 3.
-    union = np.logical_or(union, mask_water)
-    nextmask = np.logical_and(~union, mask_cloud)
-    out[nextmask] = 4.
-    union = np.logical_or(union, mask_cloud)
-    out[~union] = 5.
-
-    return out
+    # apply masks to array: the classes in reverse order of precedence,
+    # each overwriting the ones before
+    out[...] = 5
+    np.copyto(out, 4, where=mask_cloud)
+    np.copyto(out, 3, where=mask_water)
+    np.copyto(out, 2, where=mask_ice)
+    np.copyto(out, 1, where=mask_bareland)
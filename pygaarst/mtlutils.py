@@ -17,13 +17,21 @@ from future import standard_library
 standard_library.install_aliases()
 
 import os
-import glob
+import fnmatch
+import mmap
+import codecs
 import datetime
 import re
 from io import StringIO
 from ast import literal_eval
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 import logging
+try:
+    from sys import intern
+except ImportError:
+    # Python 2: intern() only takes byte strings, the metadata text is unicode
+    def intern(name):
+        return name
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -53,10 +61,10 @@ LOGGER = logging.getLogger('pygaarst.mtlutils')
 METAPATTERN = "*_MTL*"
 
 # Elements from the file format used for parsing
-GRPSTART = "GROUP="
-GRPEND = "END_GROUP="
-OBJSTART = "OBJECT="
-OBJEND = "END_OBJECT="
+GRPSTART = "GROUP"
+GRPEND = "END_GROUP"
+OBJSTART = "OBJECT"
+OBJEND = "END_OBJECT"
 ASSIGNCHAR = "="
 FINAL = "END"
 IGNOREGROUPS = [
@@ -68,21 +76,65 @@ IGNOREOBJECTS = [
     "PARAMETERVALUE"
 ]
 
-# Patterns for line sanitization
-SANITIZEPAT = [
-    (r'\s+=\s+', '='),
-    (r'^\s+', ''),
-    (r'\s+$', ''),
-]
-
-# A state machine is used to parse the file. There are 5 states (0 to 4):
+# One pattern classifies every line of the file: group/object start or end,
+# final END, key-value assignment, or anything else (a parse error).
+# Surrounding whitespace is not part of any captured value.
+LINEPATTERN = re.compile(
+    r'^[ \t]*(?:'
+    r'(?P<block>GROUP|END_GROUP|OBJECT|END_OBJECT)[ \t]*=[ \t]*(?P<name>[^\r\n]*?)'
+    r'|(?P<end>END)'
+    r'|(?P<key>[^=\r\n]*?)[ \t]*=[ \t]*(?P<value>[^\r\n]*?)'
+    r'|(?P<other>[^\r\n]*?)'
+    r')[ \t]*\r?$',
+    re.MULTILINE)
+
+# Value types recognized when post-processing metadata items
+TIMEPATTERN = re.compile(r'^"?\d{2}:\d{2}:\d{2}(\.\d{6})?"?')
+DECIMALINT = re.compile(r'^-?\d+$')
+DECIMALFLOAT = re.compile(
+    r'^-?(?:[0-9]+\.[0-9]*|\.[0-9]+|[0-9]+(?=[eE]))(?:[eE][-+]?[0-9]+)?$')
+LITERALNAMES = ('True', 'False', 'None')
+IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+DATEFORMAT = '%Y-%m-%d'
+DATETIMEFORMAT = '%Y-%m-%dT%H:%M:%SZ'
+TIMEFORMAT = '%H:%M:%S.%f'
+
+try:
+    # C implementations, Python >= 3.7
+    _isodate = datetime.date.fromisoformat
+    _isodatetime = datetime.datetime.fromisoformat
+except AttributeError:
+    def _isodate(datestr):
+        return datetime.datetime.strptime(datestr, DATEFORMAT).date()
+
+    def _isodatetime(datetimestr):
+        return datetime.datetime.strptime(datetimestr, '%Y-%m-%dT%H:%M:%S')
+
+# A state machine is used to parse the file. There are 7 states (0 to 6):
 STATUSCODE = [
     "begin",
     "enter metadata group",
     "add metadata item",
     "leave metadata group",
-    "end"
+    "end",
+    "enter object",
+    "leave object"
 ]
+BLOCKSTATUS = {GRPSTART: 1, GRPEND: 3, OBJSTART: 5, OBJEND: 6}
+
+# Permitted transitions: state before reading a line --> states after it
+TRANSITIONS = {
+    0: (1, 4),
+    1: (1, 2, 3, 5),
+    2: (1, 2, 3, 5, 6),
+    3: (1, 2, 3, 4, 5, 6),
+    5: (1, 2, 3, 5, 6),
+    6: (1, 2, 3, 5, 6),
+}
+
+
+# namedtuple types by (group name, keys), shared between parsed files
+_NAMEDTUPLES = {}
 
 
 # A custom exception for this module
@@ -104,249 +156,100 @@ def _deep_convert_dict(layer):
     return to_ret
 
 
-def _sanitizeline(line):
-    for pattern, repl in SANITIZEPAT:
-        line = re.sub(pattern, repl, line)
-    return line
-
-
-# Help functions to identify the current line and extract information
-def _islinetype(line, testchar):
-    """Checks for various kinds of line types based on line head"""
-    return line.strip().startswith(testchar)
-
-
-def _isassignment(line):
-    """Checks if the line is a key-value assignment"""
-    return ASSIGNCHAR in line
-
-def _isfinal(line):
-    """Checks if line finishes a group"""
-    return line.strip() == FINAL
-
-def _getgroupname(line):
-    """Returns group name, if used with group start lines"""
-    return line.strip().split(GRPSTART)[-1]
-
-def _getendgroupname(line):
-    """Returns group name, if used with group end lines"""
-    return line.strip().split(GRPEND)[-1]
-
-def _getobjname(line):
-    """Returns object name, if used with object start lines"""
-    return line.strip().split(OBJSTART)[-1]
-
-def _getendobjname(line):
-    """Returns group name, if used with group end lines"""
-    return line.strip().split(OBJEND)[-1]
-
-
-def _getmetadataitem(line):
-    """Returns key/value pair for assignment type lines"""
-    return line.strip().split(ASSIGNCHAR)
-
-# After reading a line, what state we're in depends on the line
-# and the state before reading
-def _checkstatus(status, line):
-    """Returns state/status after reading the next line.
-
-    The status codes are::
-        0 - BEGIN parsing; 1 - ENTER METADATA GROUP, 2 - READ KEY-VALUE PAIR,
-        3 - END METDADATA GROUP, 4 - END PARSING, 5 - BEGIN OBJECT,
-        6 - END OBJECT
-
-    Permitted Transitions::
-        0 --> 1, 0 --> 4
-        1 --> 1, 1 --> 2, 1 --> 3, 1 --> 5
-        2 --> 1, 2 --> 2, 2 --> 3, 2 --> 5, 3 --> 6
-        3 --> 1, 3 --> 2, 3 --> 4, 3 --> 5, 3 --> 6
-        5 --> 1, 5 --> 2, 5 --> 5, 5 --> 6
-        6 --> 1, 6 --> 2, 6 --> 5, 6 --> 6
-
-    """
-    newstatus = 0
-    if status == 0:
-        # begin --> enter metadata group OR end
-        if _islinetype(line, GRPSTART):
-            newstatus = 1
-        elif _isfinal(line):
-            newstatus = 4
-    elif status == 1:
-        # enter metadata group --> enter metadata group
-        # OR add metadata item OR leave metadata group
-        if _islinetype(line, GRPSTART):
-            newstatus = 1
-        elif _islinetype(line, GRPEND):
-            newstatus = 3
-        elif _islinetype(line, OBJSTART):
-            newstatus = 5
-        elif _isassignment(line):
-            # test AFTER start and end, as both are also assignments
-            newstatus = 2
-    elif status == 2:
-        if _islinetype(line, GRPEND):
-            newstatus = 3
-        elif _islinetype(line, GRPSTART):
-            newstatus = 1
-        elif _islinetype(line, OBJSTART):
-            newstatus = 5
-        elif _islinetype(line, OBJEND):
-            newstatus = 6
-        elif _isassignment(line):
-            # test AFTER start and end, as both are also assignments
-            newstatus = 2
-    elif status == 3:
-        if _islinetype(line, GRPSTART):
-            newstatus = 1
-        elif _islinetype(line, GRPEND):
-            newstatus = 3
-        elif _isfinal(line):
-            newstatus = 4
-        elif _islinetype(line, OBJSTART):
-            newstatus = 5
-        elif _islinetype(line, OBJEND):
-            newstatus = 6
-        elif _isassignment(line):
-            # test AFTER start and end, as both are also assignments
-            newstatus = 2
-    elif status == 5:
-        if _islinetype(line, GRPSTART):
-            newstatus = 1
-        elif _islinetype(line, GRPEND):
-            newstatus = 3
-        elif _islinetype(line, OBJSTART):
-            newstatus = 5
-        elif _islinetype(line, OBJEND):
-            newstatus = 6
-        elif _isassignment(line):
-            # test AFTER start and end, as both are also assignments
-            newstatus = 2
-    elif status == 6:
-        if _islinetype(line, GRPSTART):
-            newstatus = 1
-        elif _islinetype(line, GRPEND):
-            newstatus = 3
-        elif _islinetype(line, OBJSTART):
-            newstatus = 5
-        elif _islinetype(line, OBJEND):
-            newstatus = 6
-        elif _isassignment(line):
-            # test AFTER start and end, as both are also assignments
-            newstatus = 2
-    if newstatus != 0:
-        return newstatus
-    elif status != 4:
-        raise MTLParseError(
-            "Cannot parse the following line after status " +
-            "'%s':\n%s" % (STATUSCODE[status], line))
-
-
-def _transstat(status, grouppath, dictpath, line):
-    """Executes processing steps when reading a line"""
-    if status == 0:
-        raise MTLParseError(
-            "Status should not be '%s' after reading line:\n%s"
-            % (STATUSCODE[status], line))
-    elif status == 1:
-        currentdict = dictpath[-1]
-        currentgroup = _getgroupname(line)
-        grouppath.append((currentgroup, 'g'))
-        if currentgroup not in IGNOREGROUPS:
-            currentdict[currentgroup] = OrderedDict()
-            dictpath.append(currentdict[currentgroup])
-    elif status == 2:
-        currentdict = dictpath[-1]
-        currentparent = grouppath[-1]
-        newkey, newval = _getmetadataitem(line)
-        if currentparent[1] == 'g':
-            if currentparent[0] not in IGNOREGROUPS:
-                currentdict[newkey] = _postprocess(newval)
-        elif currentparent[1] == 'o':
-            if newkey == 'VALUE':
-                if currentparent[0] == "ADDITIONALATTRIBUTENAME":
-                    currentdict[_postprocess(newval)] = None
-                elif currentparent[0] == "PARAMETERVALUE":
-                    curkey, _ = currentdict.popitem()
-                    currentdict[curkey] = _postprocess(newval)
-                else:
-                    currentdict[currentparent[0]] = _postprocess(newval)
-    elif status == 3:
-        oldgroup = _getendgroupname(line)
-        if oldgroup != grouppath[-1][0]:
-            raise MTLParseError(
-                "Reached line '%s' while reading group '%s'."
-                % (line.strip(), grouppath[-1][0]))
-        del grouppath[-1]
-        if oldgroup not in IGNOREGROUPS:
-            del dictpath[-1]
-        try:
-            currentgroup = grouppath[-1][0]
-        except IndexError:
-            currentgroup = None
-    elif status == 4:
-        if grouppath:
-            raise MTLParseError(
-                "Reached end before end of group '%s'" % grouppath[-1])
-    elif status == 5:
-        currentobj = _getobjname(line)
-        grouppath.append((currentobj, 'o'))
-    elif status == 6:
-        oldobj = _getendobjname(line)
-        if oldobj != grouppath[-1][0]:
-            raise MTLParseError(
-                "Reached line '%s' while reading object '%s'."
-                % (line.strip(), grouppath[-1][0]))
-        del grouppath[-1]
-        try:
-            currentobj = grouppath[-1][0]
-        except IndexError:
-            currentobj = None
-    return grouppath, dictpath
+def _deep_convert_namedtuple(layer, name):
+    """Helper function to convert dictionaries to namedtuples, recursively.
+    Keys that aren't valid field names are renamed to _0, _1 etc."""
+    if not isinstance(layer, dict):
+        return layer
+    fields = tuple(str(key) for key in layer)
+    if not IDENTIFIER.match(name):
+        name = 'Group'
+    tupletype = _NAMEDTUPLES.get((name, fields))
+    if tupletype is None:
+        tupletype = namedtuple(name, fields, rename=True)
+        _NAMEDTUPLES[(name, fields)] = tupletype
+    return tupletype(*[
+        _deep_convert_namedtuple(value, str(key))
+        for key, value in layer.items()])
 
 
 def _postprocess(valuestr):
     """
     Takes value as str, returns str, int, float, date, datetime, or time
     """
-    intpattern = re.compile(r'^"?\-?\d+"?$')
-    floatpattern = re.compile(r'^"?\-?\d+\.\d+(E[+-]?\d\d+)?"?$')
-    datedtpattern = '%Y-%m-%d'
-    datedttimepattern = '%Y-%m-%dT%H:%M:%SZ'
-    timedtpattern = '%H:%M:%S.%f'
-    timepattern = re.compile(r'^"?\d{2}:\d{2}:\d{2}(\.\d{6})?"?')
-
-    # can we automatically parse it into something numeric?
+    # fast path for the most common value type: quoted text, such as
+    # "LANDSAT_8", that cannot be a number, date, time or Python literal
+    inner = valuestr[1:-1]
+    if (valuestr[:1] == '"' and valuestr[-1:] == '"' and inner[:1].isalpha()
+            and '"' not in inner and "'" not in inner
+            and inner.strip() not in LITERALNAMES):
+        return intern(inner)
     teststr = valuestr.replace("'", "").replace('"', "")
+    # cheap probe first: only values starting like a number, date or time
+    # (or a Python literal) can be anything but a string
+    probe = teststr.lstrip()[:1]
+    if not (probe.isdigit() or probe in ('-', '+', '.')):
+        if probe in ('[', '(', '{') or teststr.strip() in LITERALNAMES:
+            try:
+                return literal_eval(teststr.strip())
+            except (ValueError, SyntaxError):
+                pass
+        return _asstring(valuestr)
+    # plain decimal numbers, most of the numeric values, are converted
+    # directly: same result as literal_eval, without compiling the value,
+    # and integers with leading zeros (no Python literals) are included
+    stripped = teststr.strip()
+    if DECIMALINT.match(stripped):
+        return int(stripped)
+    elif DECIMALFLOAT.match(stripped):
+        return float(stripped)
+    # can we automatically parse it into something numeric?
     try:
         return literal_eval(teststr.strip())
     except ValueError:
         pass   # try something else
     except SyntaxError:
         pass
-    if re.match(intpattern, teststr):
-        # it's an integer
-        return int(teststr)
-    elif re.match(floatpattern, teststr):
-        # floating point number
-        return float(teststr)
-    # now let's try the datetime objects; throws exception if it doesn't match
-    try:
-        return datetime.datetime.strptime(teststr, datedtpattern).date()
-    except ValueError:
-        pass
-    try:
-        return datetime.datetime.strptime(teststr, datedttimepattern)
-    except ValueError:
-        pass
-    # time parsing is complicated: Python's datetime module only accepts
-    # fractions of a second only up to 6 digits
-    mat = re.match(timepattern, teststr)
-    if mat:
-        test = mat.group(0)
+    # now let's try the datetime objects, dispatching on their shape: dates
+    # and datetimes have a dash after the four-digit year, times a colon
+    # after the two-digit hour
+    if teststr[4:5] == '-':
+        # first the ISO-shaped ones that MTL files use, with the fast ISO
+        # parsers
+        if len(teststr) == 10 and teststr[7] == '-':
+            try:
+                return _isodate(teststr)
+            except ValueError:
+                pass
+        elif (len(teststr) == 20 and teststr[7] == '-'
+                and teststr[10] == 'T' and teststr[13] == teststr[16] == ':'
+                and teststr[19] == 'Z'):
+            try:
+                return _isodatetime(teststr[:19])
+            except ValueError:
+                pass
+        # strptime throws an exception if it doesn't match
         try:
-            return datetime.datetime.strptime(test, timedtpattern).time()
+            if 'T' in teststr:
+                return datetime.datetime.strptime(teststr, DATETIMEFORMAT)
+            return datetime.datetime.strptime(teststr, DATEFORMAT).date()
         except ValueError:
             pass
+    elif teststr[2:3] == ':':
+        # time parsing is complicated: Python's datetime module only accepts
+        # fractions of a second only up to 6 digits
+        mat = TIMEPATTERN.match(teststr)
+        if mat:
+            test = mat.group(0)
+            try:
+                return datetime.datetime.strptime(test, TIMEFORMAT).time()
+            except ValueError:
+                pass
+    return _asstring(valuestr)
+
+
+def _asstring(valuestr):
+    """Returns a metadata value that is not of another type as str"""
     if valuestr.startswith('"') and valuestr.endswith('"'):
         # it's a string
         return valuestr[1:-1]
@@ -357,18 +260,30 @@ def _postprocess(valuestr):
         + "int, float, date, time, datetime. Returning it as string.")
     return valuestr
 
-def parsemeta(metadataloc):
+def parsemeta(metadataloc, asobject=False):
     """Parses the metadata.
 
     Arguments:
         metadataloc: a filename or a directory. Or a the string to
         be parsed as an ODL block
+        asobject: if True, groups are returned as (nested) namedtuples
+        with the metadata keys as fields, instead of dictionaries
     Returns metadata dictionary
     """
 
     # filename or directory? if several fit, use first one and warn
-    if os.path.isdir(metadataloc):
-        metalist = glob.glob(os.path.join(metadataloc, METAPATTERN))
+    # one directory read instead of a stat followed by a glob; anything that
+    # cannot be listed is taken as a file name or as metadata text
+    try:
+        entries = os.listdir(metadataloc)
+    except (OSError, TypeError, ValueError):
+        entries = None
+    if entries is not None:
+        # like glob, skip hidden files
+        metalist = [
+            os.path.join(metadataloc, name)
+            for name in fnmatch.filter(entries, METAPATTERN)
+            if not name.startswith('.')]
         if not metalist:
             raise MTLParseError(
                 "No files matching metadata file pattern in directory %s."
@@ -389,10 +304,9 @@ def parsemeta(metadataloc):
     else:
         metadatastr = metadataloc
 
-    # Reading file line by line and inserting data into metadata dictionary
+    # Reading the file and inserting data into metadata dictionary
     try:
-        with open(metadatastr, 'r') as filehandle:
-            metadata = _parsemetastream(filehandle)
+        metadata = _parsemetastring(_readmetafile(metadatastr), metadatastr)
     except IOError:
         # maybe the argument is a string. Converting to a file-like object
         logging.info("It's not a file, trying to open it as a string.")
@@ -402,25 +316,112 @@ def parsemeta(metadataloc):
             raise MTLParseError(
                 "%s does not appear to be a file-like object " % metadatastr)
         metadata = _parsemetastream(inpstream)
+    if asobject:
+        return _deep_convert_namedtuple(metadata, 'MTL')
     return _deep_convert_dict(metadata)
 
 
+def _readmetafile(filename):
+    """Returns the content of a metadata file as text, read through a
+    memory map rather than the buffered line-oriented file object"""
+    with open(filename, 'rb') as filehandle:
+        try:
+            mapped = mmap.mmap(
+                filehandle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files cannot be mapped
+            return u''
+        try:
+            # decoded straight from the mapped buffer, without a bytes copy
+            return codecs.decode(mapped, 'utf-8')
+        finally:
+            mapped.close()
+
+
 def _parsemetastream(filehandle):
+    """Parses an MTL/ODL metadata stream into nested ordered dictionaries."""
+    return _parsemetastring(filehandle.read(), filehandle)
+
+
+def _parsemetastring(metatext, source):
+    """Parses MTL/ODL metadata text into nested ordered dictionaries.
+
+    The text is scanned with LINEPATTERN in one pass; the state after each
+    line is checked against TRANSITIONS. source is only used in messages.
+    """
     status = 0
     metadata = OrderedDict()
     grouppath = []
     dictpath = [metadata]
-    for line in filehandle:
-        line = _sanitizeline(line)
-        if not line:
+    for mat in LINEPATTERN.finditer(metatext):
+        block, key = mat.group('block'), mat.group('key')
+        if block:
+            newstatus = BLOCKSTATUS[block]
+        elif mat.group('end'):
+            newstatus = 4
+        elif key is not None:
+            newstatus = 2
+        elif mat.group('other'):
+            newstatus = 0
+        else:
+            # empty line
             continue
         if status == 4:
-            # we reached the end in the previous iteration,
-            # but are still reading lines
+            # we reached the end already, but are still reading lines
             logging.warning(
-                "Metadata file %s appears to " % filehandle +
+                "Metadata file %s appears to " % source +
                 "have extra lines after the end of the metadata. " +
                 "This is probably, but not necessarily, harmless.")
-        status = _checkstatus(status, line)
-        grouppath, dictpath = _transstat(status, grouppath, dictpath, line)
+            continue
+        if newstatus not in TRANSITIONS[status]:
+            raise MTLParseError(
+                "Cannot parse the following line after status " +
+                "'%s':\n%s" % (STATUSCODE[status], mat.group(0).strip()))
+        status = newstatus
+        if status == 1:
+            # group names and keys recur in every file of a product type:
+            # interned, they are shared and compare by identity
+            currentgroup = intern(mat.group('name'))
+            grouppath.append((currentgroup, 'g'))
+            if currentgroup not in IGNOREGROUPS:
+                currentdict = dictpath[-1]
+                currentdict[currentgroup] = OrderedDict()
+                dictpath.append(currentdict[currentgroup])
+        elif status == 2:
+            currentdict = dictpath[-1]
+            currentparent = grouppath[-1]
+            newval = mat.group('value')
+            if currentparent[1] == 'g':
+                if currentparent[0] not in IGNOREGROUPS:
+                    currentdict[intern(key)] = _postprocess(newval)
+            elif key == 'VALUE':
+                if currentparent[0] == "ADDITIONALATTRIBUTENAME":
+                    currentdict[_postprocess(newval)] = None
+                elif currentparent[0] == "PARAMETERVALUE":
+                    curkey, _ = currentdict.popitem()
+                    currentdict[curkey] = _postprocess(newval)
+                else:
+                    currentdict[currentparent[0]] = _postprocess(newval)
+        elif status == 3:
+            oldgroup = mat.group('name')
+            if oldgroup != grouppath[-1][0]:
+                raise MTLParseError(
+                    "Reached line '%s' while reading group '%s'."
+                    % (mat.group(0).strip(), grouppath[-1][0]))
+            del grouppath[-1]
+            if oldgroup not in IGNOREGROUPS:
+                del dictpath[-1]
+        elif status == 4:
+            if grouppath:
+                raise MTLParseError(
+                    "Reached end before end of group '%s'" % grouppath[-1])
+        elif status == 5:
+            grouppath.append((mat.group('name'), 'o'))
+        elif status == 6:
+            oldobj = mat.group('name')
+            if oldobj != grouppath[-1][0]:
+                raise MTLParseError(
+                    "Reached line '%s' while reading object '%s'."
+                    % (mat.group(0).strip(), grouppath[-1][0]))
+            del grouppath[-1]
     return metadata
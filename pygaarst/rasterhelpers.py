@@ -22,6 +22,9 @@ except ImportError:
     LOGGER.warning(
         "The h5py library couldn't be imported: HDF5 files aren't supported")
 
+# edge length of the per-band tiles Datacube data is chunked into
+DATACUBETILE = 256
+
 # custom exception
 class PygaarstRasterError(Exception):
     """Custom exception for errors during raster processing in Pygaarst"""
@@ -38,6 +41,13 @@ def _test_outside(testx, lower, upper):
     test = np.array(testx)
     return np.any(test < lower) or np.any(test > upper)
 
+def _readonly(array):
+    """Marks a cached array as read-only, so that callers can't modify it
+    in place for everybody else. None is passed through."""
+    if array is not None:
+        array.setflags(write=False)
+    return array
+
 def save_hypspec_to_hdf5(outfn, hypsc, spectra, i_coord, j_coord):
     """
     Save a set of spectra to HDF5
@@ -106,6 +116,12 @@ class Datacube(object):
         # only the top-left coordinate of the bottom-right pixel
         nx = len(easting)
         ny = len(northing)
+        # chunk by band plane tiles: writing a band touches only its own
+        # chunks. The flip side: a single pixel spectrum reads one whole
+        # tile (up to 256 KiB of float32) per band
+        chunks = None
+        if nx and ny and nbands:
+            chunks = (min(nx, DATACUBETILE), min(ny, DATACUBETILE), 1)
         with h5py.File(fn, 'w') as fh:
             fh.create_dataset(
                 'bandnames', data=bandnames)
@@ -114,7 +130,7 @@ class Datacube(object):
             fh.create_dataset(
                 'northing', data=northing, dtype=np.float32)
             fh.create_dataset(
-                'data', (nx, ny, nbands))
+                'data', (nx, ny, nbands), dtype=np.float32, chunks=chunks)
             if lon:
                 fh.create_dataset('lon', data=lon, dtype=np.float32)
             if lat:
@@ -81,7 +81,7 @@ class USGSL1scene(object):
         try:
             arr1 = self.__getattr__(label1).data
             arr2 = self.__getattr__(label2).data
-            return ir.normdiff(arr1, arr2)
+            return ir.normdiff(arr1, arr2, tilerows=ir.NORMDIFFROWS)
         except AttributeError:
             LOGGER.critical(
                 "Error accessing bands %s and %s to calculate NBR."
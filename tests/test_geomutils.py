@@ -8,9 +8,32 @@ Created by Chris Waigl on 2015-04-21.
 
 from __future__ import division, print_function, absolute_import, unicode_literals
 import os
+import numpy as np
 from pygaarst import geomutils as gu
 
 
 def test_modapsclient_creation():
     a = True
     assert a
+
+
+def test_overlayvectors_polygon():
+    from shapely.geometry import Polygon
+    arr = np.zeros((10, 12))
+    poly = Polygon([(1.5, 2.5), (6.5, 2.5), (6.5, 5.5), (1.5, 5.5)])
+    mask = gu.overlayvectors(arr, poly)
+    assert mask.shape == arr.shape
+    assert mask.sum() == 15
+    assert mask[3, 2] == 1
+    assert mask[2, 2] == 0
+    assert mask[3, 7] == 0
+
+
+def test_overlayvectors_clipped_polygon():
+    from shapely.geometry import Polygon
+    arr = np.zeros((5, 5))
+    poly = Polygon([(-3.5, -2.5), (2.5, -2.5), (2.5, 1.5), (-3.5, 1.5)])
+    mask = gu.overlayvectors(arr, poly)
+    assert mask.sum() == 6
+    assert mask[:2, :3].all()
+    assert mask.dtype == np.uint8
@@ -50,12 +50,29 @@ def test_rgb_geotiff_properties():
     assert np.isclose(a.Lon_pxcenter[-1][0], -146.98582879544685)
     assert np.isclose(a.Lat[0][0], 64.926695025329934)
     assert np.isclose(a.Lat_pxcenter[-1][0], 64.930598198154968)
+    assert not a.easting.flags.writeable
+    assert not a.Lon.flags.writeable
 
 
 def test_geotiff_methods():
     a = geotiff.GeoTIFF(rgbgeotiff)
     assert a.ij2xy(1, 1) == (500685.0, 7200705.0)
     assert a.xy2ij(500750, 7200725) == (0, 3)
+    i, j = a.xy2ij(np.array([500750, 500685.5]), np.array([7200725, 7200704]))
+    assert list(i) == [0, 1]
+    assert list(j) == [3, 1]
+    # a scalar easting combined with an array of northings
+    i, j = a.xy2ij(500750, np.array([7200725, 7200704]))
+    assert list(i) == [0, 1]
+    assert list(j) == [3, 3]
+
+
+def test_geotiff_close():
+    with geotiff.GeoTIFF(rgbgeotiff) as a:
+        assert a.data[0][10][5] == 55
+    assert a.dataobj is None
+    assert a.data[0][10][5] == 55
+    assert a.proj4 == u'+proj=utm +zone=6 +datum=WGS84 +units=m +no_defs'
 
 
 def test_geotiff_error():
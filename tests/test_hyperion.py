@@ -43,3 +43,14 @@ def test_spectrum_invalid(hyperionscene):
     with pytest.raises(KeyError):
         a = hyperionscene.spectrum(0, 0)
         assert a
+
+
+def test_band_without_radiance_scaling(hyperionscene):
+    # the Landsat test metadata has no RADIANCE_SCALING group: the band
+    # can still be created, only the radiance calculation fails
+    band = hyperionscene.band2
+    assert 'RADIANCE_SCALING' not in band.meta
+    with pytest.raises(hyp.PygaarstRasterError):
+        band.radiance_at(0, 0)
+    with pytest.raises(hyp.PygaarstRasterError):
+        band.radiance
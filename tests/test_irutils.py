@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+test_irutils.py
+
+Tests for pygaarst.irutils
+"""
+
+from __future__ import division, print_function, absolute_import
+import pytest
+import numpy as np
+from pygaarst import irutils as ir
+
+def test_normdiff_scalar():
+    assert ir.normdiff(3, 1) == pytest.approx(0.5)
+    result = ir.normdiff(np.array(3, dtype=np.uint16), np.array(1, dtype=np.uint16))
+    assert np.ndim(result) == 0
+    assert result.dtype == np.float32
+    assert result == pytest.approx(0.5)
+
+def test_normdiff_out():
+    array1 = np.arange(1, 41, dtype=np.uint16).reshape(8, 5)
+    array2 = np.ones((8, 5), dtype=np.uint16)
+    expected = (array1 - 1.0) / (array1 + 1.0)
+    out = np.empty((8, 5), dtype=np.float32)
+    result = ir.normdiff(array1, array2, out=out)
+    assert result is out
+    assert np.allclose(out, expected)
+    out[...] = 0
+    result = ir.normdiff(array1, array2, out=out, tilerows=3)
+    assert result is out
+    assert np.allclose(out, expected)
+
+def test_converters_list_input():
+    data = [1., 2., 3.]
+    expected = ir.rad2kelvin(np.array(data), 774.89, 1321.08)
+    assert np.allclose(ir.rad2kelvin(data, 774.89, 1321.08), expected)
+    assert np.allclose(
+        ir.rad2celsius(data, 774.89, 1321.08), expected - ir.KtoC)
+    assert np.allclose(ir.dn2rad(data, 2., 1.), [3., 5., 7.])
+    assert np.allclose(
+        ir.dn2kelvin(data, 2., 1., 774.89, 1321.08),
+        ir.rad2kelvin(np.array([3., 5., 7.]), 774.89, 1321.08))
@@ -9,6 +9,7 @@ Created by Chris Waigl on 2015-04-22.
 from __future__ import division, print_function, absolute_import, unicode_literals
 import os
 import pytest
+import numpy as np
 from pygaarst import raster
 from pygaarst import landsat as ls
 
@@ -60,6 +61,16 @@ def test_usgsband_basic_properties(landsatscene):
     assert landsatscene.band2.spacecraft == 'L8'
 
 
+def test_invalid_band_labels(landsatscene):
+    # any attribute name starting with band is taken as a band label
+    with pytest.raises(ls.PygaarstRasterError):
+        landsatscene.band99
+    with pytest.raises(ls.PygaarstRasterError):
+        landsatscene.bandfoo
+    with pytest.raises(AttributeError):
+        landsatscene.foo
+
+
 def test_tir(tirband):
     assert tirband.data[5][5] == 28786
 
@@ -73,8 +84,16 @@ def test_naivecloud(landsatscene):
 
 
 def test_radiance(landsatscene):
-    assert landsatscene.band7.radiance[2][12] == 1.368852
+    radiance = landsatscene.band7.radiance
+    assert radiance.dtype == np.float32
+    assert radiance[2][12] == pytest.approx(1.368852, rel=1e-6)
+    # the cached array is shared between callers
+    assert not radiance.flags.writeable
+    with pytest.raises(ValueError):
+        radiance[2][12] = 0
 
 
 def test_reflectance(landsatscene):
-    assert landsatscene.band7.reflectance[2][12] == 0.074893323237735315
+    reflectance = landsatscene.band7.reflectance
+    assert reflectance.dtype == np.float32
+    assert reflectance[2][12] == pytest.approx(0.074893323237735315, rel=1e-6)
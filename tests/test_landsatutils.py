@@ -9,6 +9,7 @@ Created by Chris Waigl on 2013-11-10.
 from __future__ import division, print_function, absolute_import
 import os, os.path
 import pytest
+import numpy as np
 from pygaarst import landsatutils as lu
 
 def setup_module(module):
@@ -51,7 +52,19 @@ def test_LTK(landsatscene):
     assert lu.LTKcloud(landsatscene)[3][3] == 5.0
 
 def test_tKelvin(landsatscene):
-    assert landsatscene.band10.tKelvin[-1][7] == 300.38249200364885
+    tkelvin = landsatscene.band10.tKelvin
+    assert tkelvin.dtype == np.float32
+    assert tkelvin[-1][7] == pytest.approx(300.38249200364885, rel=1e-6)
 
 def test_metadataformat(landsatscene):
-    assert landsatscene.band10.newmetaformat
\ No newline at end of file
+    assert landsatscene.band10.newmetaformat
+
+def test_LTKcloud_invalid_out(landsatscene):
+    shape = landsatscene.band2.data.shape
+    with pytest.raises(lu.PygaarstRasterError):
+        lu.LTKcloud(landsatscene, out=np.empty((1, 1), dtype=np.uint8))
+    with pytest.raises(lu.PygaarstRasterError):
+        lu.LTKcloud(landsatscene, out=np.empty(shape, dtype=bool))
+    # a list would only be filled through temporary copies
+    with pytest.raises(TypeError):
+        lu.LTKcloud(landsatscene, out=np.zeros(shape, dtype=np.uint8).tolist())
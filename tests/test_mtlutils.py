@@ -150,3 +150,8 @@ def test_read_MODL2_metadata_from_string():
     assert meta["INVENTORYMETADATA"]["ANCILLARYINPUTGRANULE"]["ANCILLARYINPUTPOINTER"] == 'MOD03.A2015167.0805.005.2015170114131.hdf'
     assert meta["INVENTORYMETADATA"]["ADDITIONALATTRIBUTES"]["AveragedBlackBodyTemperature"] == 290.01
     assert len(meta["INVENTORYMETADATA"]) == 4
+
+def test_read_metadata_L8_asobject():
+    meta = mtl.parsemeta(metadatapaths[0], asobject=True)
+    assert meta.L1_METADATA_FILE.PRODUCT_METADATA.SPACECRAFT_ID == 'LANDSAT_8'
+    assert meta.L1_METADATA_FILE.METADATA_FILE_INFO.PROCESSING_SOFTWARE_VERSION == 'LPGS_2.2.2'